@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from __future__ import annotations
+
+from argparse import Namespace
+import asyncio
+import json
+import threading
+import time
+
+from gridappsd_benchmark.publisher import MessageTemplate, PublishPlan, encode_payload, end_of_run_message
+from gridappsd_benchmark.resources import raise_open_file_limit
+from gridappsd_benchmark.scheduler import RateScheduler, ScheduleReport
+
+# Connections doing their STOMP handshake at the same time.
+MAX_CONCURRENT_CONNECTS = 256
+# Bytes a connection may buffer before the publisher waits for the socket to drain.
+WRITE_HIGH_WATER = 256 * 1024
+
+_ESCAPES = str.maketrans({"\\": "\\\\", "\r": "\\r", "\n": "\\n", ":": "\\c"})
+
+
+def encode_frame(command: str, headers: dict, body: bytes = b"") -> bytes:
+    lines = [command]
+    # STOMP 1.2 leaves the headers of CONNECT and CONNECTED frames unescaped.
+    escapes = {} if command in ("CONNECT", "CONNECTED") else _ESCAPES
+    lines.extend(f"{key}:{str(value).translate(escapes)}" for key, value in headers.items())
+    return ("\n".join(lines) + "\n\n").encode("utf-8") + body + b"\x00"
+
+
+async def read_frame(reader: asyncio.StreamReader) -> tuple[str, dict[str, str], bytes]:
+    data = await reader.readuntil(b"\x00")
+    # Heart-beats and frame separators show up as bare end-of-lines before the command.
+    head, _, body = data[:-1].lstrip(b"\r\n").partition(b"\n\n")
+    command, *header_lines = head.decode("utf-8").splitlines()
+    headers = dict(line.split(":", 1) for line in header_lines if ":" in line)
+    return command, headers, body
+
+
+class AsyncStompPublisher:
+    """A send-only STOMP 1.2 connection driven by asyncio.
+
+    Sends are written straight into the transport without waiting for receipts, so many
+    messages can be in flight on a connection; ``drain`` is only awaited once the
+    connection has ``WRITE_HIGH_WATER`` bytes buffered.  Message bodies are JSON, the same
+    encoding ``GridAPPSD.send`` uses for dict messages, so subscribers cannot tell which
+    publisher engine sent them.
+    """
+
+    def __init__(self, host: str, port: int, username: str, password: str):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._send_prefixes: dict[str, bytes] = {}
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            self._writer.write(
+                encode_frame("CONNECT", {
+                    "accept-version": "1.2",
+                    "host": "/",
+                    "login": self.username,
+                    "passcode": self.password,
+                    "heart-beat": "0,0"
+                }))
+            await self._writer.drain()
+            command, headers, body = await read_frame(self._reader)
+            if command != "CONNECTED":
+                raise ConnectionError(
+                    f"STOMP connect refused: {headers.get('message', body.decode('utf-8', 'replace'))}")
+        except BaseException:
+            self._writer.close()
+            raise
+
+    async def send(self, destination: str, body: bytes):
+        prefix = self._send_prefixes.get(destination)
+        if prefix is None:
+            prefix = encode_frame("SEND", {
+                "destination": destination,
+                "content-type": "application/json"
+            })[:-2]
+            self._send_prefixes[destination] = prefix
+        self._writer.write(b"%scontent-length:%d\n\n%s\x00" % (prefix, len(body), body))
+        if self._writer.transport.get_write_buffer_size() > WRITE_HIGH_WATER:
+            await self._writer.drain()
+
+    async def drain(self):
+        await self._writer.drain()
+
+    async def disconnect(self):
+        if not self.connected:
+            return
+        self._writer.write(encode_frame("DISCONNECT", {}))
+        await self._writer.drain()
+        self._writer.close()
+        await self._writer.wait_closed()
+
+
+class AsyncPublisherPool:
+    """Connections of the asyncio engine, kept open from run to run.
+
+    The connections belong to an event loop that runs in a daemon thread for as long as
+    the pool is open, so the harness can drive them from its own threads.
+    """
+
+    def __init__(self, opts: Namespace):
+        self.opts = opts
+        self.publishers: list[AsyncStompPublisher] = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _resize(self, count: int) -> int:
+        raise_open_file_limit(count + 256)
+        self.publishers = [publisher for publisher in self.publishers if publisher.connected]
+        while len(self.publishers) > count:
+            await self.publishers.pop().disconnect()
+        added = [
+            AsyncStompPublisher(self.opts.gridappsd_address, self.opts.gridappsd_port, self.opts.username,
+                                self.opts.password) for _ in range(count - len(self.publishers))
+        ]
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CONNECTS)
+
+        async def connect(publisher: AsyncStompPublisher):
+            async with semaphore:
+                await publisher.connect()
+
+        outcomes = await asyncio.gather(*(connect(publisher) for publisher in added), return_exceptions=True)
+        errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        if errors:
+            # Nothing is added unless every connect succeeded, the next resize starts over.
+            await asyncio.gather(*(publisher.disconnect() for publisher in added), return_exceptions=True)
+            raise errors[0]
+        self.publishers.extend(added)
+        return len(added)
+
+    def resize(self, count: int) -> int:
+        """Have ``count`` connected publishers and return how many had to be connected for it."""
+        return self._run(self._resize(count))
+
+    async def _publish(self, plan: PublishPlan, data_to_send: str) -> ScheduleReport:
+        await self._resize(plan.total_publishers)
+        opts = self.opts
+        scheduler = RateScheduler(plan.sleep_time / plan.total_publishers,
+                                  mode=plan.pacing_mode,
+                                  spin_threshold=plan.spin_threshold)
+        scheduler.start()
+        wall_offset = time.time_ns() - scheduler.start_ns
+        payload = encode_payload(data_to_send)
+        templates = [
+            MessageTemplate(plan.run_id, plan.first_publisher_id + index, payload)
+            for index in range(len(self.publishers))
+        ]
+        for i in range(plan.warmup + plan.count):
+            for index, publisher in enumerate(self.publishers):
+                deadline = await scheduler.wait_async(i * plan.total_publishers + index)
+                await publisher.send(opts.publish_topic, templates[index].render(i - plan.warmup, deadline + wall_offset))
+        report = scheduler.report()
+        for index, publisher in enumerate(self.publishers):
+            marker = end_of_run_message(plan.run_id, plan.first_publisher_id + index, plan.count,
+                                        plan.total_publishers)
+            await publisher.send(opts.publish_topic, json.dumps(marker).encode("utf-8"))
+        await asyncio.gather(*(publisher.drain() for publisher in self.publishers))
+        report.warmup = plan.warmup * plan.total_publishers
+        return report
+
+    def publish(self, plan: PublishPlan, data_to_send: str) -> ScheduleReport:
+        """Drive every publisher as its own STOMP connection from the pool's event loop."""
+        return self._run(self._publish(plan, data_to_send))
+
+    async def _disconnect(self):
+        await asyncio.gather(*(publisher.disconnect() for publisher in self.publishers), return_exceptions=True)
+        self.publishers = []
+
+    def close(self):
+        self._run(self._disconnect())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+"""NTP-style estimation of subscriber clock offsets over the message bus.
+
+The harness publishes probes stamped with its clock (t0) to the probe topic.  One
+connection in each subscriber process answers on the reply topic with the time it
+received the probe (t1) and sent the answer (t2), and the harness stamps the answer when
+it arrives (t3).  For each probe the subscriber clock is ahead of the publisher by
+``((t1 - t0) + (t2 - t3)) / 2`` give or take half the round trip,
+``(t3 - t0) - (t2 - t1)``, so the probe with the shortest round trip gives the tightest
+estimate.  The harness then publishes the estimates and every subscriber subtracts its
+offset from the times it stamps.
+"""
+from __future__ import annotations
+
+from argparse import Namespace
+from dataclasses import dataclass
+import itertools
+import threading
+import time
+
+from gridappsd import GridAPPSD
+
+from gridappsd_benchmark.histogram import format_ns
+
+PROBE_SPACING = 0.05
+REPLY_TIMEOUT = 2.0
+
+
+def clock_topics(topic: str) -> tuple[str, str]:
+    """Return the probe and reply topics used alongside a data topic."""
+    return f"{topic}.clock", f"{topic}.clock.reply"
+
+
+@dataclass
+class ClockOffset:
+    # Subscriber clock minus publisher clock.
+    offset_ns: int
+    uncertainty_ns: int
+    samples: int
+
+    def __str__(self) -> str:
+        return f"{format_ns(self.offset_ns)} ± {format_ns(self.uncertainty_ns)} from {self.samples} probes"
+
+
+def estimate_offset(samples: list[tuple[int, int, int, int]]) -> ClockOffset:
+    """Estimate from (t0, t1, t2, t3) samples, trusting the one with the shortest round trip."""
+    t0, t1, t2, t3 = min(samples, key=lambda s: (s[3] - s[0]) - (s[2] - s[1]))
+    round_trip = (t3 - t0) - (t2 - t1)
+    return ClockOffset(offset_ns=((t1 - t0) + (t2 - t3)) // 2,
+                       uncertainty_ns=max(0, round_trip) // 2 + 1,
+                       samples=len(samples))
+
+
+class ClockResponder:
+    """Answers clock probes for a subscriber process and holds the offset it was given."""
+
+    def __init__(self, gapps: GridAPPSD, name: str, reply_topic: str):
+        self.gapps = gapps
+        self.name = name
+        self.reply_topic = reply_topic
+        self.offset_ns = 0
+
+    def on_message(self, header: dict, message: dict):
+        t1 = time.time_ns()
+        if 'offsets' in message:
+            if self.name in message['offsets']:
+                self.offset_ns = message['offsets'][self.name]
+            return
+        self.gapps.send(self.reply_topic,
+                        message=dict(probe=message['probe'], responder=self.name, t0=message['t0'], t1=t1,
+                                     t2=time.time_ns()))
+
+    def now_ns(self) -> int:
+        """The current time on the publisher's clock."""
+        return time.time_ns() - self.offset_ns
+
+
+def synchronize_clocks(opts: Namespace, responders: list[str], rounds: int = 10) -> dict[str, ClockOffset]:
+    """Probe every responder ``rounds`` times and send each its estimated offset."""
+    probe_topic, reply_topic = clock_topics(opts.publish_topic)
+    samples: dict[str, list[tuple[int, int, int, int]]] = {name: [] for name in responders}
+    answered = threading.Condition()
+
+    def on_reply(header: dict, message: dict):
+        t3 = time.time_ns()
+        with answered:
+            if message['responder'] in samples:
+                samples[message['responder']].append((message['t0'], message['t1'], message['t2'], t3))
+                answered.notify_all()
+
+    gapps = GridAPPSD(stomp_address=opts.gridappsd_address,
+                      stomp_port=opts.gridappsd_port,
+                      username=opts.username,
+                      password=opts.password)
+    gapps.subscribe(reply_topic, on_reply)
+    try:
+        probe_ids = itertools.count()
+        for _ in range(rounds):
+            gapps.send(probe_topic, message=dict(probe=next(probe_ids), t0=time.time_ns()))
+            time.sleep(PROBE_SPACING)
+        with answered:
+            answered.wait_for(lambda: all(len(s) >= rounds for s in samples.values()), timeout=REPLY_TIMEOUT)
+            offsets = {name: estimate_offset(s) for name, s in samples.items() if s}
+        gapps.send(probe_topic, message=dict(offsets={name: o.offset_ns for name, o in offsets.items()}))
+    finally:
+        gapps.disconnect()
+    return offsets
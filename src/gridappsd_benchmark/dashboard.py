@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from __future__ import annotations
+
+from array import array
+from datetime import datetime
+
+from gridappsd_benchmark.histogram import NS_PER_SECOND, format_ns
+from gridappsd_benchmark.sequence import SequenceCounts
+from gridappsd_benchmark.timeseries import WindowSeries, WindowSummary
+
+# Move the cursor home and clear the screen.
+CLEAR = "\x1b[H\x1b[2J"
+
+
+class Dashboard:
+    """Terminal panel of each subscriber's rate, latency and loss.
+
+    Latency percentiles come from the panel's own windows of ``window_seconds``, kept apart
+    from the results windows so they can be short.  Latencies are added to them as they
+    arrive, which costs the same as recording them anywhere else, and the windows are
+    closed as frames are drawn.  Rates are the change in each subscriber's counters since
+    the previous frame and loss is the share of sequence numbers skipped so far.
+    """
+
+    def __init__(self, max_rows: int = 20, window_seconds: float = 1.0):
+        self.max_rows = max_rows
+        self.window_seconds = window_seconds
+        self.overall = WindowSeries(window_seconds, capacity=1)
+        self.windows: dict[str, WindowSeries] = {}
+        self._last_ns = 0
+        # subscriber -> (unique messages, bytes) at the previous frame
+        self._last: dict[str, tuple[int, int]] = {}
+
+    def _series(self, subscriber: str) -> WindowSeries:
+        series = self.windows.get(subscriber)
+        if series is None:
+            series = self.windows[subscriber] = WindowSeries(self.window_seconds, capacity=1)
+        return series
+
+    def record(self, subscriber: str, latency_ns: int, size: int):
+        self.overall.record(latency_ns, size)
+        self._series(subscriber).record(latency_ns, size)
+
+    def merge_encoded(self, subscriber: str, latency: array, num_bytes: int):
+        self.overall.merge_encoded(latency, num_bytes)
+        self._series(subscriber).merge_encoded(latency, num_bytes)
+
+    def frame(self, now_ns: int, subscribers: dict, cpu: tuple[float, float, float]) -> str:
+        """Render a frame from ``subscribers``, a mapping of name to stats with ``sequence``,
+        ``bytes`` and ``corrected`` attributes."""
+        elapsed = (now_ns - self._last_ns) / NS_PER_SECOND if self._last_ns else 0.0
+        self._last_ns = now_ns
+        rows = []
+        total = SequenceCounts()
+        total_rate = total_bytes_rate = 0.0
+        for name, stats in subscribers.items():
+            sequence = stats.sequence
+            unique, num_bytes = self._last.get(name, (sequence.unique, stats.bytes))
+            self._last[name] = (sequence.unique, stats.bytes)
+            # A reset since the last frame shows as falling counters.
+            rate = max(0, sequence.unique - unique) / elapsed if elapsed else 0.0
+            bytes_rate = max(0, stats.bytes - num_bytes) / elapsed if elapsed else 0.0
+            total.merge(sequence)
+            total_rate += rate
+            total_bytes_rate += bytes_rate
+            series = self._series(name)
+            series.roll(now_ns, sequence)
+            window = _last_window(series)
+            rows.append((name, rate, bytes_rate, window, stats.corrected.max, _loss_pct(sequence)))
+
+        _, process_cpu, thread_cpu = cpu
+        lines = [f"{datetime.now().strftime('%H:%M:%S')}  {len(subscribers)} subscribers, harness cpu: "
+                 f"{process_cpu:.1f}% of a core, {thread_cpu:.1f}% collecting results",
+                 f"latency percentiles over the last closed {self.window_seconds:g}s window, "
+                 f"max and loss since the last reset",
+                 "",
+                 f"{'subscriber':<16}{'msgs/s':>10}{'KiB/s':>10}{'p50':>12}{'p99':>12}{'max':>12}{'loss':>8}"]
+        self.overall.roll(now_ns, total)
+        lines.append(_row("all", total_rate, total_bytes_rate, _last_window(self.overall),
+                          max((row[4] for row in rows), default=0), _loss_pct(total)))
+        # The worst subscribers first, when there are more than fit.
+        rows.sort(key=lambda row: (row[3].p99_ns if row[3] else 0, row[4]), reverse=True)
+        lines.extend(_row(*row) for row in rows[:self.max_rows])
+        if len(rows) > self.max_rows:
+            lines.append(f"... {len(rows) - self.max_rows} more subscribers")
+        return CLEAR + "\n".join(lines) + "\n"
+
+
+def _last_window(series: WindowSeries) -> WindowSummary | None:
+    """The last closed window, None when nothing arrived in it.
+
+    A frame drawn late can close more than one window, the last of them empty, and its
+    percentiles of no messages would show as 0.
+    """
+    window = series.summaries[-1] if series.summaries else None
+    return window if window and window.messages else None
+
+
+def _loss_pct(sequence: SequenceCounts) -> float:
+    return 100 * max(0, sequence.gaps) / sequence.span if sequence.span else 0.0
+
+
+def _row(name: str, rate: float, bytes_rate: float, window, max_ns: int, loss_pct: float) -> str:
+    p50, p99 = (format_ns(window.p50_ns), format_ns(window.p99_ns)) if window else ("-", "-")
+    return (f"{name:<16}{rate:>10.1f}{bytes_rate / 1024:>10.1f}{p50:>12}{p99:>12}{format_ns(max_ns):>12}"
+            f"{loss_pct:>7.2f}%")
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+"""Export of each run's results as files other tools can ingest.
+
+Every run is written to its own JSON file holding everything known about it, and one
+row per run and one per subscriber are appended to ``runs.csv`` and ``subscribers.csv``
+in the same directory, with the columns below.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from pathlib import Path
+
+from gridappsd_benchmark.histogram import REPORT_PERCENTILES
+
+_PERCENTILE_COLUMNS = [f"{kind}_p{p:g}_ns" for kind in ("raw", "corrected") for p in REPORT_PERCENTILES]
+
+RUN_COLUMNS = (["time", "kind", "label", "num_publishers", "num_subscribers", "seconds_between_publishes",
+                "payload_phasors", "publisher_engine", "sent", "requested_rate", "achieved_rate", "expected",
+                "received", "loss_pct", "duplicates", "reordered", "bytes"] + _PERCENTILE_COLUMNS +
+               ["corrected_max_ns", "harness_cpu_pct", "harness_peak_rss_kib", "file"])
+
+SUBSCRIBER_COLUMNS = (["time", "kind", "label", "subscriber", "expected", "received", "loss_pct", "duplicates",
+                       "reordered", "bytes"] + _PERCENTILE_COLUMNS + ["corrected_max_ns", "file"])
+
+
+def _percentile_columns(record: dict) -> dict:
+    return {f"{kind}_{p}_ns": v for kind in ("raw", "corrected") for p, v in record[f"{kind}_ns"].items()}
+
+
+def _append_rows(path: Path, columns: list[str], rows: list[dict]):
+    new = not path.exists()
+    with path.open('a', newline='') as fh:
+        writer = csv.DictWriter(fh, columns, extrasaction='ignore')
+        if new:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def export_run(directory: str | Path, record: dict) -> Path:
+    """Write ``record`` as JSON, append its CSV rows and return the JSON file's path.
+
+    ``record`` is a run as built by the harness: the totals of ``stats_record`` plus
+    ``time``, ``kind``, ``label``, ``settings``, ``resources`` and a ``subscribers``
+    mapping of name to that subscriber's ``stats_record``.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = f"run-{record['time'].replace(':', '')}-{record['kind']}"
+    path = directory / f"{stem}.json"
+    suffix = 1
+    while path.exists():
+        suffix += 1
+        path = directory / f"{stem}-{suffix}.json"
+    path.write_text(json.dumps(record, indent=1))
+
+    settings = record["settings"]
+    common = dict(time=record["time"], kind=record["kind"], label=record["label"], file=path.name)
+    _append_rows(directory / "runs.csv", RUN_COLUMNS,
+                 [{**settings, **record, **_percentile_columns(record), **common,
+                   "num_subscribers": len(record["subscribers"]),
+                   "harness_cpu_pct": record["resources"]["harness_cpu_pct"],
+                   "harness_peak_rss_kib": record["resources"]["harness_peak_rss_kib"]}])
+    _append_rows(directory / "subscribers.csv", SUBSCRIBER_COLUMNS,
+                 [{**stats, **_percentile_columns(stats), **common, "subscriber": name}
+                  for name, stats in record["subscribers"].items()])
+    return path
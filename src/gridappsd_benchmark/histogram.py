@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from __future__ import annotations
+
+from array import array
+import math
+
+NS_PER_SECOND = 1_000_000_000
+
+REPORT_PERCENTILES: tuple[float, ...] = (50.0, 90.0, 99.0, 99.9)
+
+
+class LatencyHistogram:
+    """Log-bucketed latency histogram in the spirit of HdrHistogram.
+
+    Values are integer nanoseconds.  The first ``2 ** significant_bits`` values are
+    counted exactly; above that every power-of-two range is split into
+    ``2 ** (significant_bits - 1)`` linear sub-buckets, so a reported value is within
+    ``2 ** -(significant_bits - 1)`` of the recorded one.  Memory is fixed by
+    ``highest_trackable_ns`` no matter how many values are recorded.
+    """
+
+    def __init__(self, significant_bits: int = 8, highest_trackable_ns: int = 3600 * NS_PER_SECOND):
+        if significant_bits < 2:
+            raise ValueError("significant_bits must be at least 2")
+        self.significant_bits = significant_bits
+        self.highest_trackable_ns = highest_trackable_ns
+        self._sub_bucket_count = 1 << significant_bits
+        self._sub_bucket_half_count = self._sub_bucket_count >> 1
+        self._counts = array('q', bytes(8 * (self._index(highest_trackable_ns) + 1)))
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < self._sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.significant_bits
+        return (self._sub_bucket_count + (shift - 1) * self._sub_bucket_half_count +
+                (value >> shift) - self._sub_bucket_half_count)
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self._sub_bucket_count:
+            return index
+        shift, offset = divmod(index - self._sub_bucket_count, self._sub_bucket_half_count)
+        shift += 1
+        return ((offset + self._sub_bucket_half_count + 1) << shift) - 1
+
+    def record(self, value_ns: int, count: int = 1):
+        value_ns = max(0, int(value_ns))
+        index = self._index(min(value_ns, self.highest_trackable_ns))
+        self._counts[index] += count
+        if self.count == 0 or value_ns < self.min:
+            self.min = value_ns
+        if value_ns > self.max:
+            self.max = value_ns
+        self.count += count
+        self.total += value_ns * count
+
+    def record_seconds(self, value: float, count: int = 1):
+        self.record(round(value * NS_PER_SECOND), count)
+
+    def merge(self, other: LatencyHistogram):
+        if (other.significant_bits, other.highest_trackable_ns) != (self.significant_bits,
+                                                                    self.highest_trackable_ns):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        if other.count == 0:
+            return
+        counts = self._counts
+        for index, value in enumerate(other._counts):
+            if value:
+                counts[index] += value
+        self._add_totals(other.count, other.total, other.min, other.max)
+
+    def merge_encoded(self, encoded: array, offset: int = 0) -> int:
+        """Merge a histogram written by ``to_array`` and return the offset after it.
+
+        Only its non-empty buckets are walked, so merging a sparse encoding costs far less
+        than decoding it and merging the result.
+        """
+        significant_bits, highest, count, total, min_value, max_value, num_pairs = encoded[offset:offset + 7]
+        if (significant_bits, highest) != (self.significant_bits, self.highest_trackable_ns):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+        start, end = offset + 7, offset + 7 + 2 * num_pairs
+        if count:
+            counts = self._counts
+            for index, value in zip(encoded[start:end:2], encoded[start + 1:end:2]):
+                counts[index] += value
+            self._add_totals(count, total, min_value, max_value)
+        return end
+
+    def _add_totals(self, count: int, total: int, min_value: int, max_value: int):
+        if self.count == 0 or min_value < self.min:
+            self.min = min_value
+        self.max = max(self.max, max_value)
+        self.count += count
+        self.total += total
+
+    def reset(self):
+        self._counts = array('q', bytes(8 * len(self._counts)))
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def copy(self) -> LatencyHistogram:
+        other = LatencyHistogram(self.significant_bits, self.highest_trackable_ns)
+        other.merge(self)
+        return other
+
+    def to_array(self) -> array:
+        """Encode as int64s: layout, totals and then (index, count) pairs of non-empty buckets."""
+        encoded = array('q', [self.significant_bits, self.highest_trackable_ns, self.count, self.total,
+                              self.min, self.max, 0])
+        for index, value in enumerate(self._counts):
+            if value:
+                encoded.extend((index, value))
+        encoded[6] = (len(encoded) - 7) // 2
+        return encoded
+
+    @classmethod
+    def from_array(cls, encoded: array, offset: int = 0) -> tuple[LatencyHistogram, int]:
+        """Decode a histogram written by ``to_array`` and return it with the offset after it."""
+        histogram = cls(encoded[offset], encoded[offset + 1])
+        return histogram, histogram.merge_encoded(encoded, offset)
+
+    @staticmethod
+    def encoded_end(encoded: array, offset: int = 0) -> int:
+        """Return the offset after the histogram ``to_array`` wrote at ``offset``."""
+        return offset + 7 + 2 * encoded[offset + 6]
+
+    def buckets(self) -> list[tuple[int, int]]:
+        """Return (highest value, count) for every non-empty bucket, in increasing order."""
+        return [(min(self._highest_equivalent(index), self.max), value) for index, value in enumerate(self._counts)
+                if value]
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> int:
+        if self.count == 0:
+            return 0
+        target = max(1, math.ceil(percentile / 100.0 * self.count))
+        running = 0
+        for index, value in enumerate(self._counts):
+            running += value
+            if running >= target:
+                return min(self._highest_equivalent(index), self.max)
+        return self.max
+
+    def percentiles(self, percentiles: tuple[float, ...] = REPORT_PERCENTILES) -> dict[float, int]:
+        """Return several percentiles with a single pass over the buckets."""
+        result: dict[float, int] = {}
+        if self.count == 0:
+            return {p: 0 for p in percentiles}
+        pending = sorted(percentiles)
+        running = 0
+        for index, value in enumerate(self._counts):
+            if not value:
+                continue
+            running += value
+            while pending and running >= max(1, math.ceil(pending[0] / 100.0 * self.count)):
+                result[pending.pop(0)] = min(self._highest_equivalent(index), self.max)
+            if not pending:
+                break
+        for p in pending:
+            result[p] = self.max
+        return result
+
+    def summary(self) -> str:
+        if self.count == 0:
+            return "0 messages"
+        pct = self.percentiles()
+        parts = [f"{self.count} messages", f"mean: {format_ns(self.mean)}"]
+        parts.extend(f"p{p:g}: {format_ns(v)}" for p, v in pct.items())
+        parts.append(f"max: {format_ns(self.max)}")
+        return ", ".join(parts)
+
+
+def format_ns(value: float) -> str:
+    return f"{value / 1_000_000:.3f}ms"
+
+
+def rank_sum_z(a: LatencyHistogram, b: LatencyHistogram) -> float:
+    """Mann-Whitney rank-sum statistic of ``b`` against ``a`` as a z-score.
+
+    Positive when values in ``b`` tend to be larger.  Values in the same bucket count as
+    ties, and the variance is not corrected for them, which only makes the test more
+    conservative.
+    """
+    if (a.significant_bits, a.highest_trackable_ns) != (b.significant_bits, b.highest_trackable_ns):
+        raise ValueError("Cannot compare histograms with different bucket layouts")
+    if a.count == 0 or b.count == 0:
+        return 0.0
+    u = 0.0
+    below = 0
+    for count_a, count_b in zip(a._counts, b._counts):
+        if count_b:
+            u += count_b * (below + 0.5 * count_a)
+        below += count_a
+    mean = a.count * b.count / 2
+    sd = math.sqrt(a.count * b.count * (a.count + b.count + 1) / 12)
+    return (u - mean) / sd
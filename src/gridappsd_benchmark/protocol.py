@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+"""Binary protocol subscribers use to report to the harness over their stdout pipe.
+
+A process first writes a ready line, ``Starting Subscription`` followed by the wall clock
+times it started, finished importing the client stack and finished subscribing every
+connection.  After that line the stream is a sequence of frames, each an
+8 byte header (kind and payload length, little endian uint32) followed by the payload.
+A ``KIND_RECORDS`` payload is a batch of fixed-size records, one per received message,
+made of ``RECORD_FIELDS`` as little endian int64 so a batch decodes with one
+``array.frombytes`` call and each field is a strided slice of it.  Subscribers that
+aggregate locally send a ``KIND_SNAPSHOT`` per logical subscriber and run instead, holding
+the histograms and totals of everything received since the previous snapshot, each
+histogram in the sparse ``LatencyHistogram.to_array`` encoding.  A process
+measuring its own overhead sends a ``KIND_CPU`` frame, ``CPU_REPORT``, with the cpu time,
+messages received and wall time since its previous report.  Every readiness sentinel a
+logical subscriber receives is reported as a ``KIND_SENTINEL`` frame, ``SENTINEL_REPORT``,
+with the subscriber's index, the time the sentinel was sent and the time it arrived.  An
+end-of-run marker is reported as a ``KIND_END_OF_RUN`` frame, ``END_OF_RUN_REPORT``, with
+the subscriber's index, the run and the publisher that sent it, after everything the
+subscriber received before it.
+"""
+from __future__ import annotations
+
+from array import array
+import struct
+import sys
+import threading
+from typing import BinaryIO, Callable, Iterator
+
+from gridappsd_benchmark.histogram import LatencyHistogram
+from gridappsd_benchmark.sequence import SequenceCounts
+
+READY_LINE = b"Starting Subscription\n"
+
+FRAME_HEADER = struct.Struct("<II")
+
+KIND_RECORDS = 1
+KIND_SNAPSHOT = 2
+KIND_CPU = 3
+KIND_SENTINEL = 4
+KIND_END_OF_RUN = 5
+
+CPU_REPORT = struct.Struct("<qqq")
+SENTINEL_REPORT = struct.Struct("<qqq")
+END_OF_RUN_REPORT = struct.Struct("<qqq")
+
+# subscriber is the index of the logical subscriber in the process's name list, run is the
+# run the message was published in, publisher and seq identify the message, the times are
+# integer nanoseconds and size is the message body in bytes.
+RECORD_FIELDS = ("subscriber", "run", "publisher", "seq", "intended_ns", "sent_ns", "received_ns", "size")
+NUM_RECORD_FIELDS = len(RECORD_FIELDS)
+RECORD_SIZE = 8 * NUM_RECORD_FIELDS
+
+if sys.byteorder != "little":
+    raise ImportError("The record protocol assumes a little endian host")
+
+
+def encode_ready_line(started_ns: int, imported_ns: int, subscribed_ns: int) -> bytes:
+    return READY_LINE.rstrip(b"\n") + f" {started_ns} {imported_ns} {subscribed_ns}\n".encode()
+
+
+def parse_ready_line(line: bytes) -> tuple[int, int, int] | None:
+    """Return the startup times a ready line carries, None if ``line`` is not a ready line."""
+    prefix, ready, times = line.rstrip(b"\n").partition(READY_LINE.rstrip(b"\n"))
+    if prefix or not ready:
+        return None
+    started_ns, imported_ns, subscribed_ns = (int(value) for value in times.split())
+    return started_ns, imported_ns, subscribed_ns
+
+
+def encode_frame(kind: int, payload: bytes) -> bytes:
+    return FRAME_HEADER.pack(kind, len(payload)) + payload
+
+
+class FrameReader:
+    """Reassembles frames from the chunks a non-blocking pipe read returns."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes):
+        self._buffer += data
+
+    def __iter__(self) -> Iterator[tuple[int, bytes]]:
+        buffer = self._buffer
+        offset = 0
+        while len(buffer) - offset >= FRAME_HEADER.size:
+            kind, length = FRAME_HEADER.unpack_from(buffer, offset)
+            end = offset + FRAME_HEADER.size + length
+            if len(buffer) < end:
+                break
+            yield kind, bytes(buffer[offset + FRAME_HEADER.size:end])
+            offset = end
+        del buffer[:offset]
+
+
+def decode_records(payload: bytes) -> list[array]:
+    """Return one column per entry of ``RECORD_FIELDS``."""
+    records = array('q')
+    records.frombytes(payload)
+    return [records[i::NUM_RECORD_FIELDS] for i in range(NUM_RECORD_FIELDS)]
+
+
+def encode_snapshot(subscriber: int, run: int, num_bytes: int, sequence: SequenceCounts, raw: LatencyHistogram,
+                    corrected: LatencyHistogram) -> bytes:
+    encoded = array('q', [subscriber, run, num_bytes])
+    encoded.extend(sequence.as_tuple())
+    encoded.extend(raw.to_array())
+    encoded.extend(corrected.to_array())
+    return encoded.tobytes()
+
+
+def decode_snapshot(payload: bytes) -> tuple[int, int, int, SequenceCounts, array, array]:
+    """Return the subscriber index, run, byte total, sequence counts and raw and corrected histograms.
+
+    The histograms are left in their ``to_array`` encoding, for ``LatencyHistogram.merge_encoded``.
+    """
+    encoded = array('q')
+    encoded.frombytes(payload)
+    num_counts = len(SequenceCounts().as_tuple())
+    sequence = SequenceCounts(*encoded[3:3 + num_counts])
+    raw_start = 3 + num_counts
+    corrected_start = LatencyHistogram.encoded_end(encoded, raw_start)
+    return encoded[0], encoded[1], encoded[2], sequence, encoded[raw_start:corrected_start], encoded[corrected_start:]
+
+
+class RecordWriter:
+    """Batches records and writes them as frames from a background thread.
+
+    ``add`` is called from the message callbacks and only appends to an in-memory batch,
+    the batch is written when it reaches ``max_records`` or every ``flush_interval``
+    seconds, whichever comes first.
+    """
+
+    def __init__(self, stream: BinaryIO, max_records: int = 1024, flush_interval: float = 0.01,
+                 on_closed: Callable[[], None] | None = None):
+        self._stream = stream
+        # Called once the harness has gone away and nothing more can be written.
+        self._on_closed = on_closed
+        self._max_values = max_records * NUM_RECORD_FIELDS
+        self._flush_interval = flush_interval
+        self._batch = array('q')
+        self._batch_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._started = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @property
+    def started(self) -> bool:
+        return self._started
+
+    def start(self):
+        """Begin writing, records added before this are held until the first flush."""
+        self._started = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and write whatever is still batched."""
+        self._stopped.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        try:
+            self.flush()
+        except (BrokenPipeError, ValueError):
+            pass
+
+    def add(self, *values: int):
+        with self._batch_lock:
+            self._batch.extend(values)
+            full = len(self._batch) >= self._max_values
+        if full and self._started:
+            self.flush()
+
+    def flush(self):
+        with self._write_lock:
+            with self._batch_lock:
+                batch, self._batch = self._batch, array('q')
+            if batch:
+                self._write(KIND_RECORDS, batch.tobytes())
+
+    def write_frame(self, kind: int, payload: bytes):
+        with self._write_lock:
+            self._write(kind, payload)
+
+    def _write(self, kind: int, payload: bytes):
+        self._stream.write(encode_frame(kind, payload))
+        self._stream.flush()
+
+    def _run(self):
+        while not self._stopped.wait(self._flush_interval):
+            try:
+                self.flush()
+            except (BrokenPipeError, ValueError):
+                if self._on_closed:
+                    self._on_closed()
+                return
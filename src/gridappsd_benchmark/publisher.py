@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from __future__ import annotations
+
+from argparse import Namespace
+from dataclasses import dataclass
+from functools import partial
+import json
+import multiprocessing
+import queue
+import time
+
+from gridappsd import GridAPPSD
+
+from gridappsd_benchmark.histogram import NS_PER_SECOND
+from gridappsd_benchmark.scheduler import RateScheduler, ScheduleReport
+
+PUBLISHER_ENGINES = ("inline", "process", "asyncio")
+
+# Time between the last shard connecting and the first scheduled send.
+SHARD_START_LEAD = 0.1
+
+
+@dataclass
+class PublishPlan:
+    count: int
+    sleep_time: float
+    total_publishers: int
+    pacing_mode: str
+    spin_threshold: float
+    # Publisher index p sends as publisher id first_publisher_id + p.
+    first_publisher_id: int = 0
+    # Each publisher first sends this many warm-up messages, numbered from -warmup so the
+    # measured messages still number from 0 and subscribers can drop the rest.
+    warmup: int = 0
+    # Carried by every message, each publisher ends the run with an end-of-run marker.
+    run_id: int = 0
+
+    @property
+    def requested_rate(self) -> float:
+        return self.total_publishers / self.sleep_time
+
+
+def connect_publishers(opts: Namespace, count: int) -> list[GridAPPSD]:
+    publishers: list[GridAPPSD] = []
+    try:
+        while count > len(publishers):
+            gapps = GridAPPSD(stomp_address=opts.gridappsd_address,
+                              stomp_port=opts.gridappsd_port,
+                              username=opts.username,
+                              password=opts.password)
+            gapps.connect()
+            assert gapps.connected
+            publishers.append(gapps)
+    except BaseException:
+        # Nothing is returned to disconnect them later.
+        for gapps in publishers:
+            gapps.disconnect()
+        raise
+    return publishers
+
+
+def reconnect_dropped(opts: Namespace, publishers: list[GridAPPSD]) -> int:
+    """Replace the connections in ``publishers`` that have dropped and return how many were."""
+    dropped = [index for index, gapps in enumerate(publishers) if not gapps.connected]
+    for index in dropped:
+        publishers[index] = connect_publishers(opts, 1)[0]
+    return len(dropped)
+
+
+class PublisherPool:
+    """Connections of the inline engine, kept open from run to run."""
+
+    def __init__(self, opts: Namespace):
+        self.opts = opts
+        self.publishers: list[GridAPPSD] = []
+
+    def resize(self, count: int) -> int:
+        """Have ``count`` connected publishers and return how many had to be connected for it."""
+        connected = reconnect_dropped(self.opts, self.publishers)
+        while len(self.publishers) > count:
+            self.publishers.pop().disconnect()
+        connected += count - len(self.publishers)
+        self.publishers.extend(connect_publishers(self.opts, count - len(self.publishers)))
+        return connected
+
+    def publish(self, plan: PublishPlan, data_to_send: str) -> ScheduleReport:
+        self.resize(plan.total_publishers)
+        return send_scheduled(self.opts, plan, dict(enumerate(self.publishers)), data_to_send)
+
+    def close(self):
+        self.resize(0)
+
+
+class MessageTemplate:
+    """The JSON body of every message one publisher sends in a run, serialized once.
+
+    ``render`` only fills in the sequence number and the intended and actual send times,
+    the rest, payload included, is already encoded.  The result is byte for byte what
+    ``json.dumps`` makes of the same message as a dict, so subscribers read it as one.
+    Times are integer nanoseconds since the epoch.
+    """
+
+    def __init__(self, run: int, publisher: int, payload: bytes):
+        # payload is the JSON encoding of the payload string, see encode_payload.
+        self._format = (b'{"run": %d, "publisher": %d, "seq": %%d, "intended": %%d, "start": %%d, "payload": ' %
+                        (run, publisher)) + payload.replace(b"%", b"%%") + b"}"
+
+    def render(self, seq: int, intended_ns: int) -> bytes:
+        return self._format % (seq, intended_ns, time.time_ns())
+
+
+def encode_payload(data_to_send: str) -> bytes:
+    return json.dumps(data_to_send).encode("utf-8")
+
+
+def end_of_run_message(run: int, publisher: int, count: int, publishers: int) -> dict:
+    """Sent by a publisher on its own connection after its last message of a run, so it
+    arrives after them.  ``publishers`` is how many publishers the run has."""
+    return dict(run=run, publisher=publisher, end=count, publishers=publishers, start=time.time_ns())
+
+
+def send_scheduled(opts: Namespace, plan: PublishPlan, publishers: dict[int, GridAPPSD], data_to_send: str,
+                   start_ns: int | None = None, wall_start_ns: int | None = None) -> ScheduleReport:
+    """Send ``plan.count`` messages from each of ``publishers``, keyed by publisher index.
+
+    Publisher ``p`` sends its ``i``-th message in slot ``i * total_publishers + p`` of the
+    aggregate schedule, so any subset of the publishers can be driven from its own process
+    and the subsets still interleave evenly when they share ``start_ns``.
+    """
+    scheduler = RateScheduler(plan.sleep_time / plan.total_publishers,
+                              mode=plan.pacing_mode,
+                              spin_threshold=plan.spin_threshold)
+    scheduler.start(start_ns)
+    if wall_start_ns is None:
+        wall_start_ns = time.time_ns()
+    # The scheduler's deadlines are on the monotonic clock, this moves them onto the wall clock.
+    wall_offset = wall_start_ns - scheduler.start_ns
+    payload = encode_payload(data_to_send)
+    templates = {index: MessageTemplate(plan.run_id, plan.first_publisher_id + index, payload) for index in publishers}
+    for i in range(plan.warmup + plan.count):
+        for index, gapps in publishers.items():
+            deadline = scheduler.wait(i * plan.total_publishers + index)
+            gapps.send(opts.publish_topic, message=templates[index].render(i - plan.warmup, deadline + wall_offset))
+    report = scheduler.report(requested_rate=len(publishers) / plan.sleep_time)
+    for index, gapps in publishers.items():
+        gapps.send(opts.publish_topic,
+                   message=end_of_run_message(plan.run_id, plan.first_publisher_id + index, plan.count,
+                                              plan.total_publishers))
+    report.warmup = plan.warmup * len(publishers)
+    return report
+
+
+def _set_start_time(start_at):
+    # Runs once in the last shard to reach the barrier, before any shard is released.
+    start_at.value = time.time_ns() + round(SHARD_START_LEAD * NS_PER_SECOND)
+
+
+def _publisher_shard(opts: Namespace, indexes: list[int], commands, barrier, start_at, results):
+    # Connects once, then runs each plan it is sent until it is sent None.
+    publishers: list[GridAPPSD] = []
+    try:
+        publishers = connect_publishers(opts, len(indexes))
+        results.put((None, None))
+        while (command := commands.get()) is not None:
+            plan, data_to_send = command
+            reconnect_dropped(opts, publishers)
+            barrier.wait()
+            wall_start_ns = start_at.value
+            start_ns = time.perf_counter_ns() + (wall_start_ns - time.time_ns())
+            report = send_scheduled(opts, plan, dict(zip(indexes, publishers)), data_to_send, start_ns,
+                                    wall_start_ns)
+            results.put((report, None))
+    except Exception as e:
+        barrier.abort()
+        results.put((None, f"{type(e).__name__}: {e}"))
+    finally:
+        for gapps in publishers:
+            gapps.disconnect()
+
+
+class ShardPool:
+    """Worker processes of the process engine, kept running with their publishers connected
+    from run to run.
+
+    The publishers are split round-robin over at most ``num_processes`` workers.  For each
+    run every worker waits at a barrier, the last one to arrive sets a common start time,
+    and every worker then sends its publishers' slots of the shared aggregate schedule.
+    """
+
+    def __init__(self, opts: Namespace, num_processes: int):
+        self.opts = opts
+        self.num_processes = num_processes
+        self.total_publishers = 0
+        self.failed = False
+        self._results = None
+        self._commands = []
+        self._procs = []
+
+    def _start(self, total_publishers: int):
+        # Forking the multi-threaded harness could copy a lock another thread holds, the
+        # workers are started once per pool so a fresh interpreter costs little.
+        ctx = multiprocessing.get_context("spawn")
+        num_workers = max(1, min(self.num_processes, total_publishers))
+        start_at = ctx.Value('q', 0)
+        barrier = ctx.Barrier(num_workers, action=partial(_set_start_time, start_at))
+        self.total_publishers = total_publishers
+        self.failed = False
+        self._results = ctx.Queue()
+        self._commands = [ctx.Queue() for _ in range(num_workers)]
+        self._procs = [
+            ctx.Process(target=_publisher_shard,
+                        args=(self.opts, list(range(shard, total_publishers, num_workers)), commands, barrier,
+                              start_at, self._results),
+                        daemon=True) for shard, commands in enumerate(self._commands)
+        ]
+        for proc in self._procs:
+            proc.start()
+        # Every worker reports once it has connected.
+        self._collect()
+
+    def _collect(self) -> list[ScheduleReport]:
+        reports: list[ScheduleReport] = []
+        received = 0
+        while received < len(self._procs):
+            try:
+                report, error = self._results.get(timeout=1.0)
+            except queue.Empty:
+                if not any(proc.is_alive() for proc in self._procs):
+                    self.failed = True
+                    break
+                continue
+            received += 1
+            if error:
+                self.failed = True
+                print(f"Publisher shard failed: {error}")
+            elif report is not None:
+                reports.append(report)
+        return reports
+
+    def resize(self, count: int) -> int:
+        """Have ``count`` publishers connected and return how many were connected for it.
+
+        The publishers are spread over the workers, so a new count or a failed worker
+        starts every worker over.
+        """
+        if count == self.total_publishers and not self.failed and all(proc.is_alive() for proc in self._procs):
+            return 0
+        self.close()
+        self._start(count)
+        return count
+
+    def publish(self, plan: PublishPlan, data_to_send: str) -> ScheduleReport:
+        self.resize(plan.total_publishers)
+        for commands in self._commands:
+            commands.put((plan, data_to_send))
+        return ScheduleReport.combine(self._collect(), plan.requested_rate)
+
+    def close(self):
+        for commands in self._commands:
+            commands.put(None)
+        for proc in self._procs:
+            proc.join(timeout=5.0)
+            if proc.is_alive():
+                proc.terminate()
+        self._commands = []
+        self._procs = []
+        self.total_publishers = 0
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+"""Confirmation that the broker delivers to new subscriptions.
+
+A subscriber process is ready once ``subscribe`` has returned for every connection, but
+the broker may not route messages to a subscription until a little later, so messages
+published straight away can be lost.  Until every new subscriber has confirmed, the
+harness publishes sentinel messages on the data topic, each stamped with the time it was
+sent.  Subscribers report each sentinel they receive to the harness as a ``KIND_SENTINEL``
+frame and leave it out of their results.  A subscription is propagated once its first
+sentinel arrives, and the send time of that sentinel bounds when that happened.
+"""
+from __future__ import annotations
+
+from argparse import Namespace
+import time
+
+from gridappsd import GridAPPSD
+
+from gridappsd_benchmark.publisher import connect_publishers
+
+PROBE_INTERVAL = 0.05
+
+
+def sentinel_message() -> dict:
+    return dict(sentinel=True, start=time.time_ns())
+
+
+def is_sentinel(message: dict) -> bool:
+    return 'sentinel' in message
+
+
+class SentinelProbe:
+    """Publishes a sentinel every ``PROBE_INTERVAL`` while ``send_if_due`` keeps being called."""
+
+    def __init__(self, opts: Namespace):
+        self.opts = opts
+        self._gapps: GridAPPSD | None = None
+        self._next = 0.0
+
+    def send_if_due(self):
+        if time.monotonic() < self._next:
+            return
+        if self._gapps is None:
+            self._gapps = connect_publishers(self.opts, 1)[0]
+        self._gapps.send(self.opts.publish_topic, message=sentinel_message())
+        self._next = time.monotonic() + PROBE_INTERVAL
+
+    def close(self):
+        if self._gapps is not None:
+            self._gapps.disconnect()
+            self._gapps = None
+        self._next = 0.0
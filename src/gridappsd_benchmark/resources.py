@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+import sys
+import time
+
+
+def raise_open_file_limit(needed: int):
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+def peak_rss_kib() -> int:
+    """Peak resident memory of this process in KiB, 0 where it is not available."""
+    try:
+        import resource
+    except ImportError:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class CpuMeter:
+    """CPU used by this process, and by the thread that created or last reset the meter,
+    as a percentage of one core since the last reset.
+
+    ``reset`` has to be called from the thread being measured.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._wall = time.perf_counter()
+        self._process = time.process_time()
+        self._thread = time.thread_time()
+
+    def usage(self) -> tuple[float, float, float]:
+        """Return elapsed seconds and the process and thread cpu percentages."""
+        wall = time.perf_counter() - self._wall
+        if wall <= 0:
+            return 0.0, 0.0, 0.0
+        return (wall, 100.0 * (time.process_time() - self._process) / wall,
+                100.0 * (time.thread_time() - self._thread) / wall)
+
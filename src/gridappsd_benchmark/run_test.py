@@ -10,40 +10,439 @@
 #
 # ===----------------------------------------------------------------------===
 # }}}
-from gridappsd import GridAPPSD
-from threading import Thread
+from __future__ import annotations
+
+from threading import Lock, Thread
 from argparse import Namespace
+from array import array
 from datetime import datetime
+from functools import lru_cache
+import json
 import math
 import logging
 
 import os
 from pathlib import Path
+import selectors
 import subprocess
 import sys
 import time
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from pprint import pprint
 from typing import IO
 
+from gridappsd_benchmark.async_publisher import AsyncPublisherPool
+from gridappsd_benchmark.clock import ClockOffset, synchronize_clocks
+from gridappsd_benchmark.dashboard import Dashboard
+from gridappsd_benchmark.histogram import LatencyHistogram
+from gridappsd_benchmark.protocol import (CPU_REPORT, END_OF_RUN_REPORT, KIND_CPU, KIND_END_OF_RUN, KIND_RECORDS,
+                                          KIND_SENTINEL, KIND_SNAPSHOT, SENTINEL_REPORT, FrameReader, decode_records,
+                                          decode_snapshot, parse_ready_line)
+from gridappsd_benchmark.export import export_run
+from gridappsd_benchmark.resources import CpuMeter, peak_rss_kib
+from gridappsd_benchmark.publisher import PUBLISHER_ENGINES, PublishPlan, PublisherPool, ShardPool
+from gridappsd_benchmark.readiness import PROBE_INTERVAL, SentinelProbe
+from gridappsd_benchmark.saturation import Trial, search_max_rate
+from gridappsd_benchmark.scenario import Scenario
+from gridappsd_benchmark.scheduler import PACING_MODES, ScheduleReport
+from gridappsd_benchmark.sequence import SequenceCounts, SequenceTracker
+from gridappsd_benchmark.spawner import (START_MODES, ForkedProcess, StartupTimes, propagation_summary,
+                                         start_subscriber_process, startup_summary)
+from gridappsd_benchmark.store import ResultsStore, compare_runs, host_fingerprint
+from gridappsd_benchmark.timeseries import WindowSeries, WindowSummary, is_steady
+
 @dataclass
 class Settings:
     num_subscribers: int = 1
     num_publishers: int = 1
     num_messages_to_publish: int = 10
     seconds_between_publishes: float = 1 / 60
+    pacing_mode: str = "hybrid"
+    spin_threshold: float = 0.002
+    publisher_engine: str = "inline"
+    # 0 uses one process per cpu, never more than num_publishers.
+    num_publisher_processes: int = 0
+    # More than one runs several logical subscribers, each with its own connection, in one process.
+    subscribers_per_process: int = 1
+    # forkserver forks subscriber processes from one that imported the client stack already,
+    # up to startup_parallelism of them are started at the same time.
+    subscriber_start: str = "forkserver"
+    startup_parallelism: int = 16
+    # Longest wait for new subscriptions to receive a readiness sentinel.
+    subscription_timeout: float = 30.0
+    # Above 0 subscribers aggregate locally and send a snapshot this often instead of a record per message.
+    aggregate_interval_ms: int = 0
+    # Subscribers report their cpu time per message, every second.
+    report_subscriber_cpu: bool = False
+    # Phasors in the PMU data frame each message carries, 14 is the original payload.
+    payload_phasors: int = 14
+    # find-max-rate runs trials this long and fails one that exceeds either limit.
+    search_trial_seconds: float = 5.0
+    search_max_p99_ms: float = 100.0
+    search_max_loss_pct: float = 0.0
+    # Above 0 run publishes for this many seconds instead of num_messages_to_publish.
+    run_seconds: float = 0.0
+    # Longest wait after a run for every subscriber to receive each publisher's end-of-run
+    # marker, and how many runs' results are kept.  Each kept run holds two histograms per
+    # subscriber, about 73 KB.
+    drain_timeout: float = 10.0
+    run_history: int = 5
+    # Every publisher sends the larger of these as warm-up first, left out of every result.
+    warmup_messages: int = 0
+    warmup_seconds: float = 0.0
+    # Only measure latency once steady_windows consecutive windows have p99s within
+    # steady_tolerance_pct of each other.
+    steady_state: bool = False
+    steady_windows: int = 5
+    steady_tolerance_pct: float = 10.0
+    # Results are also rolled into windows this long, the last window_capacity are kept.
+    window_seconds: float = 60.0
+    window_capacity: int = 1440
+    # Also keep windows for each subscriber and publisher, the last source_window_capacity of each.
+    window_detail: bool = True
+    source_window_capacity: int = 60
+    dashboard_seconds: float = 1.0
+    dashboard_rows: int = 20
+    # Closed windows, and a checkpoint of the totals every checkpoint_seconds, are appended here.
+    timeseries_file: None | str = None
+    checkpoint_seconds: float = 600.0
     send_results_to_file: None | str = None
+    # Each saved run is also exported here as JSON, with a row in runs.csv and subscribers.csv.
+    export_dir: None | str = None
 
 @dataclass
 class AppState:
     main_running: bool = True
     reset_stats: bool = False
     show_stats: bool = False
+    # Messages published since the last reset, every subscriber should receive all of them.
+    messages_sent: int = 0
+    # Every run's publishers get new ids so their sequence numbers start over.
+    next_publisher_id: int = 0
+    next_run_id: int = 1
+    last_run_id: int = 0
+    # Redraw the live dashboard every dashboard_seconds.
+    dashboard: bool = False
+    # Open while send_results_to_file is set.
+    store: ResultsStore | None = None
+    # Set while a run with steady_state on has not reached it, with the time the run started.
+    awaiting_steady_state: bool = False
+    run_started_ns: int = 0
+    # Set while new subscriptions have not received a readiness sentinel yet, runs wait for them.
+    confirming_subscriptions: bool = False
+    # Publisher connections of the current engine, kept open between runs.
+    publishers: PublisherPool | ShardPool | AsyncPublisherPool | None = None
+
+@dataclass
+class SubscriberStats:
+    # raw is measured from the actual send, corrected from the time the schedule intended
+    # the message to be sent so stalls in the publisher are not hidden (coordinated omission).
+    raw: LatencyHistogram = field(default_factory=LatencyHistogram)
+    corrected: LatencyHistogram = field(default_factory=LatencyHistogram)
+    bytes: int = 0
+    sequence: SequenceCounts = field(default_factory=SequenceCounts)
+
+    def merge(self, other: SubscriberStats):
+        self.raw.merge(other.raw)
+        self.corrected.merge(other.corrected)
+        self.bytes += other.bytes
+        self.sequence.merge(other.sequence)
+
+    def merge_snapshot(self, raw: array, corrected: array, num_bytes: int, sequence: SequenceCounts):
+        """Add a snapshot as ``decode_snapshot`` returns it, histograms still encoded."""
+        self.raw.merge_encoded(raw)
+        self.corrected.merge_encoded(corrected)
+        self.bytes += num_bytes
+        self.sequence.merge(sequence)
+
+    def reset(self):
+        self.raw.reset()
+        self.corrected.reset()
+        self.bytes = 0
+        self.sequence.reset()
+
+    def loss_pct(self, expected: int) -> float:
+        return 100 * max(0, expected - self.sequence.unique) / expected if expected else 0.0
+
+    def loss_summary(self, expected: int) -> str:
+        return (f"{self.loss_pct(expected):.2f}% of {expected} messages lost, {self.sequence.gaps} gaps, "
+                f"{self.sequence.duplicates} duplicates, {self.sequence.reordered} out of order")
+
+@dataclass
+class SubscriberProcess:
+    proc: subprocess.Popen | ForkedProcess
+    names: list[str]
+    frames: FrameReader = field(default_factory=FrameReader)
+    # Totals of the cpu reports sent since the last reset.
+    cpu_ns: int = 0
+    cpu_messages: int = 0
+    cpu_wall_ns: int = 0
+    # Set by sync-clocks, the subscribers correct their timestamps by it.
+    clock_offset: ClockOffset | None = None
+    startup: StartupTimes | None = None
+    # Indexes of the subscribers that have not received a readiness sentinel yet.
+    unconfirmed: set[int] = field(default_factory=set)
+
+    def reset_cpu(self):
+        self.cpu_ns = self.cpu_messages = self.cpu_wall_ns = 0
+
+@dataclass
+class RunResults:
+    """Statistics of one run per subscriber name, from the run id every message carries."""
+    run_id: int
+    num_publishers: int
+    # Messages each subscriber should receive.
+    expected: int
+    subscribers: dict[str, SubscriberStats] = field(default_factory=dict)
+    trackers: dict[str, SequenceTracker] = field(default_factory=dict)
+    # The publishers whose end-of-run marker each subscriber received.
+    ended: dict[str, set[int]] = field(default_factory=dict)
+    drain_seconds: float | None = None
+
+    def stats_for(self, subscriber: str) -> SubscriberStats:
+        stats = self.subscribers.get(subscriber)
+        if stats is None:
+            stats = self.subscribers[subscriber] = SubscriberStats()
+            self.trackers[subscriber] = SequenceTracker(stats.sequence)
+        return stats
+
+    def undrained(self, names: list[str]) -> list[str]:
+        """The subscribers in ``names`` still missing an end-of-run marker."""
+        return [name for name in names if len(self.ended.get(name, ())) < self.num_publishers]
+
+    def merged(self) -> SubscriberStats:
+        merged = SubscriberStats()
+        for stats in self.subscribers.values():
+            merged.merge(stats)
+        return merged
+
+
+class Results:
+    """Statistics per subscriber name, filled by the results thread and read from the menu."""
+
+    def __init__(self):
+        self.lock = Lock()
+        self.subscribers: dict[str, SubscriberStats] = {}
+        # Sequence tracking for subscribers sending a record per message, aggregating
+        # subscribers track their own and send the counts.
+        self.trackers: dict[str, SequenceTracker] = {}
+        # Each publisher's counts over every subscriber that sends records.
+        self.publisher_counts: dict[int, SequenceCounts] = {}
+        # Results over consecutive windows for all subscribers together and, with
+        # window_detail on, for each subscriber and each publisher.
+        self.series = self._new_series("all", settings.window_capacity)
+        self.subscriber_windows: dict[str, WindowSeries] = {}
+        self.publisher_windows: dict[int, WindowSeries] = {}
+        # Publishers with a series whose end-of-run marker every subscriber has received.
+        self.ended_publishers: set[int] = set()
+        self.timeseries: IO[str] | None = None
+        self.next_checkpoint_ns = 0
+        # The last run_history runs since the last reset, by run id.
+        self.runs: dict[int, RunResults] = {}
+        # The results thread's latest CpuMeter.usage(), its thread share can only be measured there.
+        self.harness_cpu: tuple[float, float, float] = (0.0, 0.0, 0.0)
+
+    @staticmethod
+    def _new_series(source: str, capacity: int, significant_bits: int = 8) -> WindowSeries:
+        return WindowSeries(settings.window_seconds, capacity, on_close=write_window, source=source,
+                            significant_bits=significant_bits)
+
+    def stats_for(self, subscriber: str) -> SubscriberStats:
+        stats = self.subscribers.get(subscriber)
+        if stats is None:
+            stats = self.subscribers[subscriber] = SubscriberStats()
+            self.trackers[subscriber] = SequenceTracker(stats.sequence, publisher_counts=self.publisher_counts)
+            if settings.window_detail:
+                self.subscriber_windows[subscriber] = self._new_series(subscriber, settings.source_window_capacity)
+        return stats
+
+    def start_run(self, run_id: int, num_publishers: int, expected: int) -> RunResults:
+        with self.lock:
+            run = self.runs[run_id] = RunResults(run_id, num_publishers, expected)
+            while len(self.runs) > settings.run_history:
+                del self.runs[next(iter(self.runs))]
+        return run
+
+    def end_of_run(self, run_id: int, publisher: int, subscriber: str, running: list[str]):
+        """Note that ``subscriber`` received the end-of-run marker of ``publisher``, called
+        with the lock held.
+
+        Publishers get new ids every run, so nothing more arrives from this one.  Once every
+        subscriber in ``running`` has its marker, its counts are dropped, or if it has a
+        series, when the series is.
+        """
+        if subscriber in self.trackers:
+            self.trackers[subscriber].forget(publisher)
+        run = self.runs.get(run_id)
+        if run:
+            run.ended.setdefault(subscriber, set()).add(publisher)
+            if subscriber in run.trackers:
+                run.trackers[subscriber].forget(publisher)
+            if any(publisher not in run.ended.get(name, ()) for name in running):
+                return
+        if publisher in self.publisher_windows:
+            self.ended_publishers.add(publisher)
+        else:
+            self.publisher_counts.pop(publisher, None)
+
+    def publisher_series(self, publisher: int) -> WindowSeries | None:
+        series = self.publisher_windows.get(publisher)
+        if series is None and settings.window_detail:
+            # Publishers can number in the thousands, their windows use coarser histograms.
+            series = self.publisher_windows[publisher] = self._new_series(f"publisher{publisher}",
+                                                                          settings.source_window_capacity,
+                                                                          significant_bits=5)
+        return series
+
+    def merged(self) -> SubscriberStats:
+        merged = SubscriberStats()
+        with self.lock:
+            for stats in self.subscribers.values():
+                merged.merge(stats)
+        return merged
+
+    def received(self) -> int:
+        """Distinct messages received over every subscriber."""
+        with self.lock:
+            return sum(stats.sequence.unique for stats in self.subscribers.values())
+
+    def total_counts(self) -> SequenceCounts:
+        counts = SequenceCounts()
+        for stats in self.subscribers.values():
+            counts.merge(stats.sequence)
+        return counts
+
+    def roll(self, now_ns: int):
+        """Close finished windows, called with the lock held.
+
+        A publisher's series is dropped, with its counts, once every subscriber has its
+        end-of-run marker and a whole window then closes without its messages, so publishers from earlier runs do not
+        accumulate while a stall mid-run still shows up as empty windows.
+        """
+        if not self.series.due(now_ns):
+            return
+        self.series.roll(now_ns, self.total_counts())
+        for subscriber, series in self.subscriber_windows.items():
+            series.roll(now_ns, self.subscribers[subscriber].sequence)
+        for publisher, series in list(self.publisher_windows.items()):
+            if (series.roll(now_ns, self.publisher_counts[publisher]) and series.summaries[-1].messages == 0 and
+                    publisher in self.ended_publishers):
+                del self.publisher_windows[publisher]
+                del self.publisher_counts[publisher]
+                self.ended_publishers.discard(publisher)
+
+    def reset(self):
+        with self.lock:
+            for stats in self.subscribers.values():
+                stats.reset()
+            for subscriber, stats in self.subscribers.items():
+                self.trackers[subscriber] = SequenceTracker(stats.sequence, publisher_counts=self.publisher_counts)
+            # The trackers were started over, the counts of earlier publishers are not needed.
+            self.publisher_counts.clear()
+            self.publisher_windows = {}
+            self.ended_publishers = set()
+            for series in (self.series, *self.subscriber_windows.values()):
+                series.rebase(SequenceCounts())
+            self.runs = {}
+
+    def reset_latency(self, run_id: int):
+        """Forget the latencies run ``run_id`` received so far but keep counting its messages.
+
+        The totals since the last reset keep them, they cover earlier runs too.
+        """
+        with self.lock:
+            run = self.runs.get(run_id)
+            for stats in (run.subscribers.values() if run else ()):
+                stats.raw.reset()
+                stats.corrected.reset()
+
+    def set_window(self):
+        """Start the windows over with the current window settings."""
+        with self.lock:
+            self.series = self._new_series("all", settings.window_capacity)
+            self.subscriber_windows = {}
+            self.publisher_windows = {}
+            for publisher in self.ended_publishers:
+                self.publisher_counts.pop(publisher, None)
+            self.ended_publishers = set()
+            if settings.window_detail:
+                for subscriber in self.subscribers:
+                    self.subscriber_windows[subscriber] = self._new_series(subscriber,
+                                                                           settings.source_window_capacity)
+
+def stats_record(stats: SubscriberStats, expected: int) -> dict:
+    """Summarize ``stats`` as a JSON-ready dict."""
+    return dict(expected=expected,
+                received=stats.sequence.unique,
+                loss_pct=stats.loss_pct(expected),
+                gaps=stats.sequence.gaps,
+                duplicates=stats.sequence.duplicates,
+                reordered=stats.sequence.reordered,
+                bytes=stats.bytes,
+                raw_ns={f"p{p:g}": v for p, v in stats.raw.percentiles().items()},
+                corrected_ns={f"p{p:g}": v for p, v in stats.corrected.percentiles().items()},
+                corrected_max_ns=stats.corrected.max)
+
+
+def write_window(source: str, summary: WindowSummary):
+    if results.timeseries:
+        results.timeseries.write(json.dumps(dict(kind="window",
+                                                 source=source,
+                                                 time=datetime.fromtimestamp(summary.start_ns / 1e9).isoformat(),
+                                                 msgs_per_second=summary.msgs_per_second,
+                                                 bytes_per_second=summary.bytes_per_second,
+                                                 loss_pct=summary.loss_pct,
+                                                 **asdict(summary))) + "\n")
+        results.timeseries.flush()
+
+
+def roll_windows(now_ns: int):
+    """Close finished windows and write a checkpoint of the totals when one is due."""
+    if results.series.due(now_ns):
+        with results.lock:
+            results.roll(now_ns)
+    if results.timeseries and now_ns >= results.next_checkpoint_ns:
+        results.next_checkpoint_ns = now_ns + round(settings.checkpoint_seconds * 1e9)
+        expected = app_state.messages_sent * len(results.subscribers)
+        line = json.dumps(dict(kind="checkpoint",
+                               time=datetime.now().isoformat(timespec='seconds'),
+                               messages_sent=app_state.messages_sent,
+                               **stats_record(results.merged(), expected)))
+        with results.lock:
+            if results.timeseries:
+                results.timeseries.write(line + "\n")
+                results.timeseries.flush()
+
+
+def check_steady_state():
+    with results.lock:
+        summaries = [s for s in results.series.summaries if s.start_ns >= app_state.run_started_ns]
+    if is_steady(summaries[-settings.steady_windows:] if len(summaries) >= settings.steady_windows else [],
+                 settings.steady_tolerance_pct):
+        app_state.awaiting_steady_state = False
+        results.reset_latency(app_state.last_run_id)
+        print(f"Steady state reached {(time.time_ns() - app_state.run_started_ns) / 1e9:.1f}s into the run, "
+              f"latency is measured from here.")
+
+
+def set_timeseries_file(filename: str | None):
+    with results.lock:
+        if results.timeseries:
+            results.timeseries.close()
+            results.timeseries = None
+        settings.timeseries_file = filename
+        if filename:
+            results.timeseries = open(filename, 'a')
+            results.next_checkpoint_ns = 0
+
 
 settings = Settings()
 app_state = AppState()
+results = Results()
 
-def get_message_to_publish() -> str:
+# Building the frame is slow, each payload is built once per number of phasors.
+@lru_cache(maxsize=None)
+def get_message_to_publish(num_phasors: int = 14) -> str:
     from synchrophasor.pmu import Pmu
     from synchrophasor.frame import ConfigFrame2, HeaderFrame, DataFrame
 
@@ -53,6 +452,12 @@ def get_message_to_publish() -> str:
     ph_v_conversion = int(300000.0 / 32768 * 100000)  # Voltage phasor conversion factor
     ph_i_conversion = int(15000.0 / 32768 * 100000)  # Current phasor conversion factor
 
+    # Phasors repeat the three voltages and a current of the original frame.
+    names = [f"{name}{group or ''}" for group, name in
+             ((i // 4, ("VA", "VB", "VC", "I1")[i % 4]) for i in range(num_phasors))]
+    conversions = [(ph_i_conversion, "i") if name.startswith("I") else (ph_v_conversion, "v") for name in names]
+    phasors = [((14635, 0), (-7318, -12676), (-7318, 12675), (1092, 0))[i % 4] for i in range(num_phasors)]
+
     cfg = ConfigFrame2(
         7,  # PMU_ID
         1000000,  # TIME_BASE
@@ -61,12 +466,11 @@ def get_message_to_publish() -> str:
         7734,  # Data-stream ID(s)
         (False, False, True,
         False),  # Data format - Check ConfigFrame2 set_data_format()
-        14,  # Number of phasors
+        num_phasors,  # Number of phasors
         3,  # Number of analog values
         1,  # Number of digital status words
-        [
-            "VA", "VB", "VC", "I1", "VA1", "VB1", "VC1", "I11", "VA2", "VB2",
-            "VC2", "I12", "VA3", "VB3", "ANALOG1", "ANALOG2", "ANALOG3",
+        names + [
+            "ANALOG1", "ANALOG2", "ANALOG3",
             "BREAKER 1 STATUS", "BREAKER 2 STATUS", "BREAKER 3 STATUS",
             "BREAKER 4 STATUS", "BREAKER 5 STATUS", "BREAKER 6 STATUS",
             "BREAKER 7 STATUS", "BREAKER 8 STATUS", "BREAKER 9 STATUS",
@@ -74,11 +478,7 @@ def get_message_to_publish() -> str:
             "BREAKER D STATUS", "BREAKER E STATUS", "BREAKER F STATUS",
             "BREAKER G STATUS"
         ],  # Channel Names
-        [(ph_v_conversion, "v"), (ph_v_conversion, "v"), (ph_v_conversion, "v"),
-        (ph_i_conversion, "i"), (ph_v_conversion, "v"), (ph_v_conversion, "v"),
-        (ph_v_conversion, "v"), (ph_i_conversion, "i"), (ph_v_conversion, "v"),
-        (ph_v_conversion, "v"), (ph_v_conversion, "v"), (ph_i_conversion, "i"),
-        (ph_v_conversion, "v"), (ph_v_conversion, "v")],  # Conversion factor for phasor channels
+        conversions,  # Conversion factor for phasor channels
         [(1, "pow"), (1, "rms"),
         (1, "peak")],  # Conversion factor for analog channels
         [(0x0000, 0xffff)],  # Mask words for digital status words
@@ -93,9 +493,7 @@ def get_message_to_publish() -> str:
         7,  # PMU_ID
         ("ok", True, "timestamp", False, False, False, 0, "<10",
         0),  # STAT WORD - Check DataFrame set_stat()
-        [(14635, 0), (-7318, -12676), (-7318, 12675), (1092, 0), (14635, 0),
-        (-7318, -12676), (-7318, 12675), (1092, 0), (14635, 0), (-7318, -12676),
-        (-7318, 12675), (1092, 0), (14635, 0), (-7318, -12676)],  # PHASORS (3 - v, 1 - i)
+        phasors,  # PHASORS (3 - v, 1 - i)
         2500,  # Frequency deviation from nominal in mHz
         0,  # Rate of Change of Frequency
         [100, 1000, 10000],  # Analog Values
@@ -110,133 +508,662 @@ def get_message_to_publish() -> str:
     return data_to_send.hex()
 
 
-def run_single_subscriber_no_blocking(subscriber_name: str, opts: Namespace):
-    #global main_running
-
-    pth = Path(__file__).parent / 'single_subscriber.py'
-    cmd = [sys.executable,
-           pth.as_posix(),
-           f"{subscriber_name}",
-           "--gridappsd-address", f"{opts.gridappsd_address}",
-           "--gridappsd-port", str(opts.gridappsd_port),
-           "--username", f"{opts.username}",
-           "--password", f"{opts.password}",
-           "--subscription-topic", f"{opts.publish_topic}"]
-    #print(' '.join(cmd))
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=os.environ.copy())
-    # Set non-blocking process.
-    os.set_blocking(proc.stdout.fileno(), False)
-    os.set_blocking(proc.stderr.fileno(), False)
-    while app_state.main_running:
-        line = proc.stdout.readline()
-        err = proc.stderr.readline()
-        if line == b'Starting Subscription\n':
+READ_SIZE = 1 << 16
+
+def read_available(fd: int) -> bytes | None:
+    """Read everything currently buffered in a non-blocking pipe, None once it is closed."""
+    chunks = []
+    while True:
+        try:
+            chunk = os.read(fd, READ_SIZE)
+        except BlockingIOError:
             break
-        elif line:
-            print(f"The line is: {line}")
+        if not chunk:
+            if not chunks:
+                return None
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def start_subscribers(batches: list[list[str]], opts: Namespace) -> list[SubscriberProcess]:
+    """Start a process for each list of subscriber names and wait for all of them to be ready."""
+    subs = []
+    for subscriber_names in batches:
+        args = [*subscriber_names,
+                "--gridappsd-address", f"{opts.gridappsd_address}",
+                "--gridappsd-port", str(opts.gridappsd_port),
+                "--username", f"{opts.username}",
+                "--password", f"{opts.password}",
+                "--subscription-topic", f"{opts.publish_topic}",
+                "--aggregate-interval-ms", str(settings.aggregate_interval_ms),
+                "--cpu-report-interval-ms", "1000" if settings.report_subscriber_cpu else "0"]
+        spawned_ns = time.time_ns()
+        proc = start_subscriber_process(args, settings.subscriber_start)
+        subs.append(SubscriberProcess(proc, subscriber_names, startup=StartupTimes(spawned_ns)))
 
-        if err:
-            print(f"The error is: {err}")
-        #time.sleep(0.01)
-    print("Subscriber Startup Complete")
-    return proc
+    # Output before each ready line, by process.
+    pending = {id(sub): b"" for sub in subs}
+    with selectors.DefaultSelector() as selector:
+        for sub in subs:
+            selector.register(sub.proc.stdout, selectors.EVENT_READ, sub)
+            selector.register(sub.proc.stderr, selectors.EVENT_READ, sub)
+        while app_state.main_running and pending:
+            for key, _ in selector.select(timeout=0.1):
+                sub = key.data
+                data = read_available(key.fd)
+                if data is None:
+                    selector.unregister(key.fileobj)
+                elif key.fileobj is sub.proc.stderr:
+                    print(f"The error is: {data}")
+                elif id(sub) in pending:
+                    pending[id(sub)] += data
+                    while id(sub) in pending and b'\n' in pending[id(sub)]:
+                        line, pending[id(sub)] = pending[id(sub)].split(b'\n', 1)
+                        times = parse_ready_line(line)
+                        if times is None:
+                            print(f"The line is: {line}")
+                            continue
+                        sub.startup.started_ns, sub.startup.imported_ns, sub.startup.subscribed_ns = times
+                        sub.startup.ready_ns = time.time_ns()
+                        sub.unconfirmed = set(range(len(sub.names)))
+                        # Everything after the ready line is result frames, read by the results thread.
+                        sub.frames.feed(pending.pop(id(sub)))
+                        selector.unregister(sub.proc.stdout)
+                        if sub.proc.stderr in selector.get_map():
+                            selector.unregister(sub.proc.stderr)
+            for sub in subs:
+                if id(sub) in pending and sub.proc.poll() is not None:
+                    print(f"Subscriber {describe_subscribers(sub.names)} exited during startup with code "
+                          f"{sub.proc.returncode}")
+                    del pending[id(sub)]
+    return subs
+
+def describe_subscribers(names: list[str]) -> str:
+    first, last = names[0].removeprefix('subscriber'), names[-1].removeprefix('subscriber')
+    return first if len(names) == 1 else f"{first}-{last}"
 
 # main_running: bool = True
 # reset_stats: bool = False
 # show_stats: bool = False
 
-def gather_results_thread(opts: Namespace, proc_list: list[subprocess.Popen]):
+def gather_results_thread(opts: Namespace, proc_list: list[SubscriberProcess]):
     # global main_running
     # global reset_stats
     # global show_stats
     # global settings
 
-    count_received = 0
-    received_taken: dict[str, list[float]] = {}
-    # fh: IO[str] | None = None
-
+    # Wakes only when a subscriber has written something, or every 100ms to act on the menu.
+    selector = selectors.DefaultSelector()
+    cpu = CpuMeter()
+    # Only kept while the dashboard is shown, it gets every latency.
+    dashboard: Dashboard | None = None
+    next_frame = 0.0
+    probe = SentinelProbe(opts)
+    # Processes whose subscriptions are being confirmed, and when to give up on them.
+    confirming: list[SubscriberProcess] = []
+    confirm_deadline = 0.0
 
     while app_state.main_running:
-        # if settings.send_results_to_file:
-        #     print(f"Writing results to file {settings.send_results_to_file}.")
-        #     fh = open(settings.send_results_to_file, 'w')
-        # elif fh and not settings.send_results_to_file:
-        #     fh.close()
-        #     fh = None
-        #     print(f"Stopped writing results to file.")
-
-        if settings.num_subscribers > len(proc_list):
-            print(f"Creating Subscriber: {len(proc_list) + 1}")
-            proc_list.append(run_single_subscriber_no_blocking(f"subscriber{len(proc_list) + 1}", opts))
+        num_running = sum(len(sub.names) for sub in proc_list)
+        if settings.num_subscribers > num_running:
+            # Start up to startup_parallelism processes at once.
+            batches = []
+            while len(batches) < settings.startup_parallelism and num_running < settings.num_subscribers:
+                num_new = min(settings.subscribers_per_process, settings.num_subscribers - num_running)
+                batches.append([f"subscriber{num_running + i + 1}" for i in range(num_new)])
+                num_running += num_new
+            print(f"Creating Subscriber: {describe_subscribers([name for names in batches for name in names])}")
+            app_state.confirming_subscriptions = True
+            subs = start_subscribers(batches, opts)
+            for sub in subs:
+                selector.register(sub.proc.stdout, selectors.EVENT_READ, sub)
+                selector.register(sub.proc.stderr, selectors.EVENT_READ, sub)
+            proc_list.extend(subs)
+            ready = [sub.startup for sub in subs if sub.startup.ready_ns]
+            if ready:
+                print(f"Subscriber Startup Complete: {startup_summary(ready)}")
             continue
-        if settings.num_subscribers < len(proc_list):
-            print(f"Terminating Subscriber: {len(proc_list)}")
-            proc_list.pop().terminate()
+        if settings.num_subscribers < num_running:
+            # Whole processes are stopped, a shortfall is made up by the next pass.
+            sub = proc_list.pop()
+            print(f"Terminating Subscriber: {describe_subscribers(sub.names)}")
+            for pipe in (sub.proc.stdout, sub.proc.stderr):
+                if pipe in selector.get_map():
+                    selector.unregister(pipe)
+            sub.proc.terminate()
             continue
 
         if app_state.show_stats:
-            for k, v in received_taken.items():
-                count = len(v)
-                total = sum(v)
-                if count == 0:
+            merged = results.merged()
+            for k, v in results.subscribers.items():
+                if v.raw.count == 0:
                     print(f"No messages received for subscriber: {k}")
                 else:
-                    print(f"{k} received: {len(v)} messages, average: {total / count}")
-            if not received_taken.items():
+                    print(f"{k} received: {v.raw.summary()}, {v.bytes} bytes")
+                    print(f"{k} corrected: {v.corrected.summary()}")
+                    print(f"{k} loss: {v.loss_summary(app_state.messages_sent)}")
+            if not results.subscribers:
                 print("No messages received yet.")
+            elif len(results.subscribers) > 1:
+                print(f"all subscribers received: {merged.raw.summary()}, {merged.bytes} bytes")
+                print(f"all subscribers corrected: {merged.corrected.summary()}")
+                print(f"all subscribers loss: "
+                      f"{merged.loss_summary(app_state.messages_sent * len(results.subscribers))}")
+            for sub in proc_list:
+                if sub.clock_offset:
+                    print(f"subscriber {describe_subscribers(sub.names)} clock offset: {sub.clock_offset}, "
+                          f"latencies carry this uncertainty")
+                if sub.cpu_messages:
+                    print(f"subscriber {describe_subscribers(sub.names)} cpu: "
+                          f"{sub.cpu_ns / sub.cpu_messages / 1000:.1f}us per message, "
+                          f"{100 * sub.cpu_ns / sub.cpu_wall_ns:.1f}% of a core")
+            wall, process_cpu, thread_cpu = cpu.usage()
+            print(f"harness cpu: {process_cpu:.1f}% of a core over {wall:.1f}s, "
+                  f"{thread_cpu:.1f}% collecting results")
             app_state.show_stats = False
 
         if app_state.reset_stats:
-            count_received = 0
-            sum_total = 0
             app_state.reset_stats = False
             app_state.show_stats = False
-            received_taken.clear()
+            app_state.messages_sent = 0
+            results.reset()
+            for sub in proc_list:
+                sub.reset_cpu()
+            cpu.reset()
 
-        for proc in proc_list:
-            line = proc.stdout.readline()
-            if not line:
+        waiting = [sub for sub in proc_list if sub.unconfirmed]
+        if waiting and not confirming:
+            confirm_deadline = time.monotonic() + settings.subscription_timeout
+        confirming.extend(sub for sub in waiting if sub not in confirming)
+        if waiting and time.monotonic() > confirm_deadline:
+            print(f"No readiness sentinel within {settings.subscription_timeout}s for: "
+                  f"{', '.join(sub.names[i] for sub in waiting for i in sorted(sub.unconfirmed))}")
+            for sub in waiting:
+                sub.unconfirmed.clear()
+            waiting = []
+        if waiting:
+            probe.send_if_due()
+        elif confirming:
+            probe.close()
+            confirmed = [sub.startup for sub in confirming if sub.startup.confirmed_ns]
+            if confirmed:
+                print(f"Subscriptions Confirmed: {propagation_summary(confirmed)}")
+            confirming = []
+        app_state.confirming_subscriptions = bool(waiting)
+
+        roll_windows(time.time_ns())
+        if app_state.awaiting_steady_state:
+            check_steady_state()
+        results.harness_cpu = cpu.usage()
+        if not app_state.dashboard:
+            dashboard = None
+        elif dashboard is None or (dashboard.max_rows, dashboard.window_seconds) != (settings.dashboard_rows,
+                                                                                     settings.dashboard_seconds):
+            dashboard = Dashboard(settings.dashboard_rows, settings.dashboard_seconds)
+        if dashboard and time.monotonic() >= next_frame:
+            next_frame = time.monotonic() + settings.dashboard_seconds
+            with results.lock:
+                frame = dashboard.frame(time.time_ns(), results.subscribers, results.harness_cpu)
+            sys.stdout.write(frame)
+            sys.stdout.flush()
+        for key, _ in selector.select(timeout=PROBE_INTERVAL if waiting else 0.1):
+            sub = key.data
+            data = read_available(key.fd)
+            if data is None:
+                selector.unregister(key.fileobj)
+                continue
+            if key.fileobj is sub.proc.stderr:
+                print(f"The error is: {data}")
                 continue
-            # if line:
-            #     if fh:
-            #         fh.write(line.decode('utf-8'))
-            #         fh.flush()
-            line = line.decode('utf-8')
-            try:
-                subscriber, start, end, taken = line.strip().split(',')
-                if subscriber not in received_taken:
-                    received_taken[subscriber] = []
-                received_taken[subscriber].append(float(taken))
-
-            except ValueError: # Happens because we aren't blocking so stream just comes in.
-                if line != '':
-                    print(f"The line is: {line}")
-
-def publish_messages(opts: Namespace, count: int = 10, sleep_time: float = 1 / 60, count_publishers: int = 1):
-    publishers: list[GridAPPSD] = []
-
-    while count_publishers > len(publishers):
-        gapps = GridAPPSD(stomp_address=opts.gridappsd_address,
-                        stomp_port=opts.gridappsd_port,
-                        username=opts.username,
-                        password=opts.password)
-        publishers.append(gapps)
-
-    print(f"Publishing {count} messages, one every {sleep_time}s from {count_publishers} publishers.")
-    data_to_send = get_message_to_publish()
-    gapps.connect()
-    assert gapps.connected
-
-    for i in range(count):
-        ts_now = datetime.utcnow().timestamp()
-        message = dict(start=ts_now, payload=data_to_send)
-        for gapps in publishers:
-            gapps.send(opts.publish_topic, message=message)
-            time.sleep(0.00001)
-        time.sleep(sleep_time)
-
-    for gapps in publishers:
-        gapps.disconnect()
+            sub.frames.feed(data)
+            for kind, payload in sub.frames:
+                if kind == KIND_SNAPSHOT:
+                    i, run_id, num_bytes, sequence, raw, corrected = decode_snapshot(payload)
+                    with results.lock:
+                        results.stats_for(sub.names[i]).merge_snapshot(raw, corrected, num_bytes, sequence)
+                        if run_id in results.runs:
+                            results.runs[run_id].stats_for(sub.names[i]).merge_snapshot(raw, corrected, num_bytes,
+                                                                                        sequence)
+                        results.series.merge_encoded(corrected, num_bytes)
+                        if sub.names[i] in results.subscriber_windows:
+                            results.subscriber_windows[sub.names[i]].merge_encoded(corrected, num_bytes)
+                        if dashboard:
+                            dashboard.merge_encoded(sub.names[i], corrected, num_bytes)
+                    continue
+                if kind == KIND_END_OF_RUN:
+                    i, run_id, publisher = END_OF_RUN_REPORT.unpack(payload)
+                    with results.lock:
+                        results.end_of_run(run_id, publisher, sub.names[i],
+                                           [name for running in proc_list for name in running.names])
+                    continue
+                if kind == KIND_SENTINEL:
+                    index, sent_ns, _ = SENTINEL_REPORT.unpack(payload)
+                    if index in sub.unconfirmed:
+                        sub.unconfirmed.discard(index)
+                        sub.startup.confirmed_ns = max(sub.startup.confirmed_ns, sent_ns)
+                    continue
+                if kind == KIND_CPU:
+                    cpu_ns, messages, wall_ns = CPU_REPORT.unpack(payload)
+                    sub.cpu_ns += cpu_ns
+                    sub.cpu_messages += messages
+                    sub.cpu_wall_ns += wall_ns
+                    continue
+                if kind != KIND_RECORDS:
+                    print(f"Unknown frame kind {kind} from subscriber: {describe_subscribers(sub.names)}")
+                    continue
+                index, run, publisher, seq, intended_ns, sent_ns, received_ns, size = decode_records(payload)
+                with results.lock:
+                    series = results.series
+                    subscriber_windows = results.subscriber_windows
+                    publisher_windows = results.publisher_windows
+                    runs = results.runs
+                    detail = settings.window_detail
+                    for i, run_id, pub, n, intended, sent, received, num_bytes in zip(index, run, publisher, seq,
+                                                                                      intended_ns, sent_ns,
+                                                                                      received_ns, size):
+                        subscriber = sub.names[i]
+                        stats = results.stats_for(subscriber)
+                        stats.raw.record(received - sent)
+                        stats.corrected.record(received - intended)
+                        stats.bytes += num_bytes
+                        results.trackers[subscriber].record(pub, n)
+                        if run_id in runs:
+                            run_stats = runs[run_id].stats_for(subscriber)
+                            run_stats.raw.record(received - sent)
+                            run_stats.corrected.record(received - intended)
+                            run_stats.bytes += num_bytes
+                            runs[run_id].trackers[subscriber].record(pub, n)
+                        series.record(received - intended, num_bytes)
+                        if subscriber in subscriber_windows:
+                            subscriber_windows[subscriber].record(received - intended, num_bytes)
+                        if dashboard:
+                            dashboard.record(subscriber, received - intended, num_bytes)
+                        if detail and (publisher_series := publisher_windows.get(pub) or results.publisher_series(pub)):
+                            publisher_series.record(received - intended, num_bytes)
+
+def publish_messages(opts: Namespace, count: int = 10, sleep_time: float = 1 / 60, count_publishers: int = 1) -> ScheduleReport:
+    # Messages sent before the broker routes to every subscription would be lost.
+    while app_state.main_running and app_state.confirming_subscriptions:
+        time.sleep(PROBE_INTERVAL)
+    # Each publisher sends one message every sleep_time seconds, the sends are staggered
+    # evenly across the interval so the aggregate stream is count_publishers / sleep_time.
+    plan = PublishPlan(count=count,
+                       sleep_time=sleep_time,
+                       total_publishers=count_publishers,
+                       pacing_mode=settings.pacing_mode,
+                       spin_threshold=settings.spin_threshold,
+                       first_publisher_id=app_state.next_publisher_id,
+                       warmup=max(settings.warmup_messages, math.ceil(settings.warmup_seconds / sleep_time)),
+                       run_id=app_state.next_run_id)
+    app_state.next_publisher_id += count_publishers
+    app_state.next_run_id += 1
+    app_state.last_run_id = plan.run_id
+    run = results.start_run(plan.run_id, count_publishers, count * count_publishers)
+    warmup = f" after {plan.warmup} warm-up messages" if plan.warmup else ""
+    print(f"Run {plan.run_id}: publishing {count} messages{warmup}, one every {sleep_time}s from {count_publishers} publishers "
+          f"({plan.requested_rate:.1f} msgs/s aggregate, {settings.publisher_engine} engine).")
+    if settings.steady_state:
+        app_state.run_started_ns = time.time_ns()
+        app_state.awaiting_steady_state = True
+    data_to_send = get_message_to_publish(settings.payload_phasors)
+
+    report = publisher_pool(opts, count_publishers).publish(plan, data_to_send)
+
+    print(report)
+    if app_state.awaiting_steady_state:
+        app_state.awaiting_steady_state = False
+        print("No steady state within the run, its latency covers the whole run.")
+    app_state.messages_sent += report.sent - report.warmup
+    run.expected = report.sent - report.warmup
+    return report
+
+
+def messages_per_publisher() -> int:
+    """Messages each publisher sends in a test, from run_seconds when it is set."""
+    if settings.run_seconds > 0:
+        return max(1, round(settings.run_seconds / settings.seconds_between_publishes))
+    return settings.num_messages_to_publish
+
+
+def show_trend(num_windows: int, source: str = "all"):
+    with results.lock:
+        if source == "all":
+            series = results.series
+        elif source.startswith("publisher") and source.removeprefix("publisher").isnumeric():
+            series = results.publisher_windows.get(int(source.removeprefix("publisher")))
+        else:
+            series = results.subscriber_windows.get(source)
+        summaries = list(series.summaries)[-num_windows:] if series else []
+    if series is None:
+        print(f"No windows are kept for {source}.")
+    elif not summaries:
+        print(f"No {settings.window_seconds:g}s window has closed yet for {source}.")
+    for summary in summaries:
+        print(f"{datetime.fromtimestamp(summary.start_ns / 1e9).strftime('%H:%M:%S.%f')[:-3]} {summary}")
+
+
+def drain_run(proc_list: list[SubscriberProcess], timeout: float) -> RunResults | None:
+    """Wait until every subscriber received the end-of-run marker of every publisher of the
+    last run, at most ``timeout`` seconds, and return that run's results."""
+    names = [name for sub in proc_list for name in sub.names]
+    started = time.monotonic()
+    while app_state.main_running:
+        with results.lock:
+            run = results.runs.get(app_state.last_run_id)
+            if run is None:
+                return None
+            undrained = run.undrained(names)
+            if not undrained:
+                run.drain_seconds = time.monotonic() - started
+                return run
+        if time.monotonic() - started >= timeout:
+            more = f" and {len(undrained) - 10} more" if len(undrained) > 10 else ""
+            print(f"Run {run.run_id} did not drain within {timeout}s, still waiting on: "
+                  f"{', '.join(undrained[:10])}{more}")
+            return run
+        time.sleep(0.01)
+    return None
+
+
+def show_run(run: RunResults, num_subscribers: int, per_subscriber: bool = False):
+    subscribers: dict[str, SubscriberStats] = {}
+    with results.lock:
+        merged = run.merged()
+        for name, stats in (run.subscribers.items() if per_subscriber else ()):
+            subscribers[name] = SubscriberStats()
+            subscribers[name].merge(stats)
+    if run.drain_seconds is not None:
+        print(f"run {run.run_id} drained {run.drain_seconds:.3f}s after publishing ended")
+    for name, stats in subscribers.items():
+        print(f"run {run.run_id} {name} received: {stats.raw.summary()}, {stats.bytes} bytes")
+        print(f"run {run.run_id} {name} corrected: {stats.corrected.summary()}")
+        print(f"run {run.run_id} {name} loss: {stats.loss_summary(run.expected)}")
+    if merged.raw.count == 0:
+        print(f"run {run.run_id}: no messages received.")
+        return
+    print(f"run {run.run_id} received: {merged.raw.summary()}, {merged.bytes} bytes")
+    print(f"run {run.run_id} corrected: {merged.corrected.summary()}")
+    print(f"run {run.run_id} loss: {merged.loss_summary(run.expected * num_subscribers)}")
+
+
+def wait_for_subscribers(proc_list: list[SubscriberProcess]):
+    """Wait until the results thread has started or stopped processes to match the settings
+    and every subscription is confirmed."""
+    while app_state.main_running and (sum(len(sub.names) for sub in proc_list) != settings.num_subscribers or
+                                      app_state.confirming_subscriptions):
+        time.sleep(0.1)
+
+
+def measure(opts: Namespace, proc_list: list[SubscriberProcess], rate: float, duration: float,
+            drain_timeout: float) -> tuple[ScheduleReport, RunResults, SubscriberStats, int]:
+    """Reset results, publish at ``rate`` msgs/s for ``duration`` seconds and wait for the subscribers.
+
+    Returns the schedule report, the run's results, every subscriber's results of the run
+    merged and how many messages the subscribers should have received between them.  The
+    run's latencies leave out the warm-up, the totals since the reset do not.
+    """
+    sleep_time = settings.num_publishers / rate
+    count = max(2, round(duration / sleep_time))
+    results.reset()
+    app_state.messages_sent = 0
+    report = publish_messages(opts, count, sleep_time, settings.num_publishers)
+    run = drain_run(proc_list, drain_timeout)
+    with results.lock:
+        if run is None:
+            # Only when the harness is stopping, the run may be all there is to report.
+            run = results.runs.get(app_state.last_run_id) or RunResults(app_state.last_run_id,
+                                                                        settings.num_publishers, 0)
+        merged = run.merged()
+    return report, run, merged, run.expected * sum(len(sub.names) for sub in proc_list)
+
+
+def run_trial(opts: Namespace, proc_list: list[SubscriberProcess], rate: float) -> Trial:
+    """Publish at ``rate`` msgs/s for ``search_trial_seconds`` and judge the result."""
+    report, run, merged, expected = measure(opts, proc_list, rate, settings.search_trial_seconds,
+                                            drain_timeout=max(5.0, settings.search_trial_seconds))
+    loss_pct = merged.loss_pct(expected)
+    p99 = merged.corrected.percentile(99)
+    message_size = merged.bytes / merged.raw.count if merged.raw.count else 0
+    failure = None
+    if report.achieved_rate < 0.95 * rate:
+        failure = "publishers could not keep up"
+    elif loss_pct > settings.search_max_loss_pct:
+        failure = "loss over the limit"
+    elif p99 > settings.search_max_p99_ms * 1_000_000:
+        failure = "corrected p99 over the limit"
+    record_results(opts, proc_list, "trial", f"find-max-rate {rate:.1f} msgs/s", report, expected, merged,
+                   run.subscribers)
+    trial = Trial(requested_rate=rate,
+                  achieved_rate=report.achieved_rate,
+                  bytes_per_second=report.achieved_rate * message_size,
+                  loss_pct=loss_pct,
+                  corrected_p99_ns=p99,
+                  failure=failure)
+    print(f"Trial: {trial}")
+    return trial
+
+
+def find_max_rate(opts: Namespace, proc_list: list[SubscriberProcess]):
+    wait_for_subscribers(proc_list)
+    start_rate = settings.num_publishers / settings.seconds_between_publishes
+    print(f"Searching for the maximum rate with {settings.num_publishers} publishers, "
+          f"{settings.num_subscribers} subscribers and {settings.payload_phasors} phasors per message, "
+          f"starting at {start_rate:.1f} msgs/s.")
+    best, trials = search_max_rate(lambda rate: run_trial(opts, proc_list, rate), start_rate)
+    if best is None:
+        print(f"No rate was sustained in {len(trials)} trials.")
+        return
+    print(f"Maximum sustained rate: {best.achieved_rate:.1f} msgs/s, {best.bytes_per_second / 1024:.1f} KiB/s "
+          f"published, {best.achieved_rate * settings.num_subscribers:.1f} msgs/s delivered over all "
+          f"subscribers ({len(trials)} trials).")
+
+
+def run_scenario(opts: Namespace, proc_list: list[SubscriberProcess], scenario: Scenario):
+    """Run every cell of ``scenario`` and append one JSON line per cell to its output file."""
+    for key, value in scenario.settings.items():
+        if not hasattr(settings, key):
+            raise ValueError(f"Unknown setting in scenario {scenario.name}: {key}")
+        setattr(settings, key, value)
+    # Files named in the scenario are opened like the menu commands would.
+    if "send_results_to_file" in scenario.settings:
+        set_results_store(settings.send_results_to_file)
+    if "timeseries_file" in scenario.settings:
+        set_timeseries_file(settings.timeseries_file)
+    # Subscriber settings only apply to processes started afterwards, start them all over.
+    settings.num_subscribers = 0
+    wait_for_subscribers(proc_list)
+    print(f"Running scenario {scenario.name}: {scenario.num_cells} cells, results in {scenario.output}")
+    with open(scenario.output, 'a') as fh:
+        for number, cell in enumerate(scenario.cells(), start=1):
+            if not app_state.main_running:
+                break
+            print(f"Cell {number} of {scenario.num_cells}: {cell}")
+            settings.num_subscribers = cell.subscribers
+            settings.num_publishers = cell.publishers
+            settings.payload_phasors = cell.payload_phasors
+            settings.seconds_between_publishes = cell.publishers / cell.rate
+            wait_for_subscribers(proc_list)
+            if scenario.warmup_seconds > 0:
+                measure(opts, proc_list, cell.rate, scenario.warmup_seconds, scenario.cooldown_seconds)
+            report, run, merged, expected = measure(opts, proc_list, cell.rate, cell.duration,
+                                                    scenario.cooldown_seconds)
+            record_results(opts, proc_list, "cell", f"{scenario.name} {number} of {scenario.num_cells}", report,
+                           expected, merged, run.subscribers)
+            record = dict(scenario=scenario.name,
+                          time=datetime.now().isoformat(timespec='seconds'),
+                          **asdict(cell),
+                          settings=asdict(settings),
+                          sent=report.sent,
+                          achieved_rate=report.achieved_rate,
+                          schedule_lag_p99_ns=report.lag.percentile(99),
+                          **stats_record(merged, expected))
+            fh.write(json.dumps(record) + "\n")
+            fh.flush()
+    print(f"Scenario {scenario.name} complete.")
+
+
+def publisher_pool(opts: Namespace, count: int) -> PublisherPool | ShardPool | AsyncPublisherPool:
+    """Return the publisher pool of the current engine with ``count`` publishers connected.
+
+    The pool is replaced when the engine or the number of publisher processes changed,
+    otherwise it only connects what is missing or has dropped.
+    """
+    pool = app_state.publishers
+    num_processes = settings.num_publisher_processes or os.cpu_count() or 1
+    if settings.publisher_engine == "process":
+        current = isinstance(pool, ShardPool) and pool.num_processes == num_processes
+    elif settings.publisher_engine == "asyncio":
+        current = isinstance(pool, AsyncPublisherPool)
+    else:
+        current = isinstance(pool, PublisherPool)
+    if not current:
+        close_publisher_pool()
+        if settings.publisher_engine == "process":
+            pool = ShardPool(opts, num_processes)
+        elif settings.publisher_engine == "asyncio":
+            pool = AsyncPublisherPool(opts)
+        else:
+            pool = PublisherPool(opts)
+        app_state.publishers = pool
+    begin = time.perf_counter()
+    connected = pool.resize(count)
+    if connected:
+        print(f"Connected {connected} publishers in {time.perf_counter() - begin:.2f}s")
+    return pool
+
+
+def connect_publisher_pool(opts: Namespace):
+    """Connect the publishers for the current settings ahead of the next run.
+
+    A failure is only reported, the settings are kept and the next run connects again.
+    """
+    try:
+        publisher_pool(opts, settings.num_publishers)
+    except Exception as e:
+        print(f"Could not connect the publishers, the next run tries again: {type(e).__name__}: {e}")
+
+
+def close_publisher_pool():
+    if app_state.publishers:
+        app_state.publishers.close()
+        app_state.publishers = None
+
+
+def set_results_store(filename: str | None):
+    if app_state.store:
+        app_state.store.close()
+        app_state.store = None
+    settings.send_results_to_file = filename
+    if filename:
+        app_state.store = ResultsStore(filename)
+
+
+def run_record(opts: Namespace, proc_list: list[SubscriberProcess], kind: str, label: str,
+               report: ScheduleReport, expected: int, merged: SubscriberStats,
+               subscribers: dict[str, SubscriberStats]) -> dict:
+    """Everything known about a run as a JSON-ready dict, called with the results lock held."""
+    running = {name for sub in proc_list for name in sub.names}
+    expected_per_subscriber = expected // max(1, len(running))
+    _, process_cpu, thread_cpu = results.harness_cpu
+    return dict(time=datetime.now().isoformat(timespec='seconds'),
+                kind=kind,
+                label=label,
+                settings=asdict(settings),
+                host=host_fingerprint(opts.gridappsd_address, opts.gridappsd_port),
+                sent=report.sent,
+                requested_rate=report.requested_rate,
+                achieved_rate=report.achieved_rate,
+                schedule_lag_ns={f"p{p:g}": v for p, v in report.lag.percentiles().items()},
+                **stats_record(merged, expected),
+                histograms=dict(raw=merged.raw.buckets(), corrected=merged.corrected.buckets()),
+                subscribers={name: dict(**stats_record(stats, expected_per_subscriber),
+                                        histograms=dict(raw=stats.raw.buckets(),
+                                                        corrected=stats.corrected.buckets()))
+                             for name, stats in subscribers.items() if name in running},
+                resources=dict(harness_cpu_pct=process_cpu,
+                               harness_collecting_cpu_pct=thread_cpu,
+                               harness_peak_rss_kib=peak_rss_kib(),
+                               subscriber_processes=[
+                                   dict(subscribers=sub.names,
+                                        cpu_us_per_message=sub.cpu_ns / sub.cpu_messages / 1000,
+                                        cpu_pct=100 * sub.cpu_ns / sub.cpu_wall_ns)
+                                   for sub in proc_list if sub.cpu_messages]))
+
+
+def record_results(opts: Namespace, proc_list: list[SubscriberProcess], kind: str, label: str,
+                   report: ScheduleReport, expected: int, merged: SubscriberStats,
+                   subscribers: dict[str, SubscriberStats]):
+    """Save a run's results to the results file and export them, when either is set.
+
+    ``merged`` and ``subscribers`` must cover the same messages as ``report``, either one
+    run's results or the totals after a reset just before it.
+    """
+    if app_state.store is None and not settings.export_dir:
+        return
+    with results.lock:
+        if app_state.store:
+            run_id = app_state.store.save_run(kind, label, asdict(settings),
+                                              host_fingerprint(opts.gridappsd_address, opts.gridappsd_port),
+                                              report, expected, merged, subscribers)
+            print(f"Saved as run {run_id} in {app_state.store.path}")
+        record = (run_record(opts, proc_list, kind, label, report, expected, merged, subscribers)
+                  if settings.export_dir else None)
+    if record:
+        print(f"Exported to {export_run(settings.export_dir, record)}")
+
+
+def save_run(opts: Namespace, proc_list: list[SubscriberProcess], report: ScheduleReport, run: RunResults,
+             label: str = ""):
+    """Save the results of ``run`` after it has drained."""
+    if app_state.store is None and not settings.export_dir:
+        return
+    with results.lock:
+        merged = run.merged()
+    expected = run.expected * sum(len(sub.names) for sub in proc_list)
+    record_results(opts, proc_list, "run", label, report, expected, merged, run.subscribers)
+
+
+def list_runs(limit: int):
+    if app_state.store is None:
+        print("No results file is set, use set-results-to-file.")
+        return
+    for run in app_state.store.recent(limit):
+        baselines = app_state.store.baselines(run.id)
+        print(f"{run}{' [' + ', '.join(baselines) + ']' if baselines else ''}")
+
+
+def save_baseline(name: str, reference: str | None = None):
+    if app_state.store is None:
+        print("No results file is set, use set-results-to-file.")
+        return
+    run_id = app_state.store.resolve(reference) if reference else app_state.store.latest()
+    if run_id is None:
+        print(f"No saved run {reference or ''}")
+        return
+    app_state.store.set_baseline(name, run_id)
+    print(f"Baseline {name} is run {run_id}")
+
+
+def compare(baseline: str, candidate: str | None = None):
+    if app_state.store is None:
+        print("No results file is set, use set-results-to-file.")
+        return
+    baseline_id = app_state.store.resolve(baseline)
+    candidate_id = app_state.store.resolve(candidate) if candidate else app_state.store.latest()
+    if baseline_id is None or candidate_id is None:
+        print(f"No saved run or baseline {baseline if baseline_id is None else candidate}")
+        return
+    for line in compare_runs(app_state.store.load(baseline_id), app_state.store.load(candidate_id)):
+        print(line)
+
+
+def sync_clocks(opts: Namespace, proc_list: list[SubscriberProcess], rounds: int = 10):
+    # The first subscriber of every process answers the probes for its process.
+    offsets = synchronize_clocks(opts, [sub.names[0] for sub in proc_list], rounds)
+    for sub in proc_list:
+        sub.clock_offset = offsets.get(sub.names[0])
+        print(f"subscriber {describe_subscribers(sub.names)} clock offset: {sub.clock_offset or 'no reply'}")
 
 
 def menu():
@@ -247,15 +1174,62 @@ def menu():
   Settings:
     set-num-subscribers <int> -             Set number of subscribers
     set-num-publishers <int> -              Set number of publishers
+    set-subscribers-per-process <int> -     Set number of subscribers hosted by one process
+    set-subscriber-start <forkserver|subprocess> -
+                                            Fork new subscriber processes from one with the client
+                                            stack imported, or start each in a new interpreter
+    set-startup-parallelism <int> -         Set number of subscriber processes started at the same time
+    set-subscription-timeout <float> -      Set how long runs wait for new subscriptions to be confirmed
     set-num-messages <int> -                Set number of messages to publish in a single test
     set-seconds-between-publishes <float> - Set number of seconds between publishes
-    set-results-to-file <filename> -        Set the file to write results to
+    set-pacing <sleep|spin|hybrid> -        Set how the publisher waits for the next send
+    set-spin-threshold <float> -            Set seconds before a send that hybrid pacing starts spinning
+    set-publisher-engine <inline|process|asyncio> -
+                                            Publish from this process, from worker processes or
+                                            from one asyncio STOMP connection per publisher
+    set-num-publisher-processes <int> -     Set number of worker processes for the process engine
+    set-aggregate-interval-ms <int> -       Aggregate in new subscribers, sending results this often (0 is off)
+    set-subscriber-cpu <on|off> -           Have new subscribers report their cpu time per message
+    set-payload-phasors <int> -             Set number of phasors in each published PMU frame
+    set-search-trial-seconds <float> -      Set how long find-max-rate publishes at each rate
+    set-search-max-p99-ms <float> -         Set the corrected p99 latency find-max-rate allows
+    set-search-max-loss-pct <float> -       Set the message loss find-max-rate allows
+    set-warmup-messages <int> -             Set warm-up messages each publisher sends before a test, left out of results
+    set-warmup-seconds <float> -            Set warm-up time before a test, the larger warm-up is used
+    set-steady-state <on|off> -             Only measure latency once windowed p99 latency stabilizes
+    set-run-seconds <float> -               Publish for this long per test instead of a message count (0 is off)
+    set-drain-timeout <float> -             Set how long a test waits for every subscriber to receive its end
+    set-window-seconds <float> -            Set the length of the windows results are rolled into, resets them
+    set-dashboard-seconds <float> -         Set how often the dashboard is redrawn
+    set-window-detail <on|off> -            Keep windows for each subscriber and publisher as well, resets them
+    set-timeseries-file <filename|off> -    Append every closed window and periodic checkpoints to a file
+    set-checkpoint-seconds <float> -        Set how often a checkpoint of the totals is written
+    set-results-to-file <filename|off> -    Save every run's settings and results to this SQLite file
+    set-export-dir <directory|off> -        Export every run as JSON and CSV into this directory
 
+  sync-clocks -     Estimate and correct each subscriber process's clock offset
   show-settings -   Show current settings
   results -         See Results of running tests
+  dashboard <on|off> -
+                    Redraw a live panel of every subscriber's rate, latency and loss
+  trend [<int> [<source>]] -
+                    Show the last windows of results, 10 by default, for all subscribers
+                    together or for one subscriber or publisher, e.g. subscriber2 or publisher0
   reset -           Reset results
   run -             Run a test
   run-range <int> - Run a range of tests
+  run-results [<int>] -
+                    Show each subscriber's results of a test, the last by default
+  find-max-rate -   Search for the highest rate the bus sustains, resets results
+  run-scenario <file> -
+                    Run every cell of a scenario file, resets results
+
+  list-runs [<int>] -
+                    List the last runs saved in the results file, 10 by default
+  save-baseline <name> [<run>] -
+                    Name a saved run, the latest by default, as a baseline
+  compare <run|baseline> [<run|baseline>] -
+                    Compare a saved run, the latest by default, against another and flag regressions
 
   exit/quit -       Close the program down
 """)
@@ -281,82 +1255,191 @@ def _main():
                         help="The username to use for all connections.")
     parser.add_argument("--password", default="manager",
                         help="The password to use for all connections.")
+    parser.add_argument("--scenario", type=str,
+                        help="Run the cells of this scenario file and exit instead of showing the menu.")
     opts = parser.parse_args()
 
-    menu()
+    scenario = Scenario.load(opts.scenario) if opts.scenario else None
+    if scenario:
+        # The scenario starts the subscribers it needs.
+        settings.num_subscribers = 0
+    else:
+        menu()
     proc_list: list = []
 
     results_thread = Thread(target=gather_results_thread,
                             daemon=True,
                             args=[opts, proc_list])
     results_thread.start()
-    exit_yes = False
-    while not exit_yes:
-        result = input(">")
-
-        match result.strip():
-            case 'help':
-                menu()
-            case 'results':
-                app_state.show_stats = True
-            case 'quit' | 'exit':
-                exit_yes = True
-                break
-            case 'run':
-                # print(f"Sending:\n{get_message_to_publish()}")
-                publish_messages(opts=opts,
-                                 count=settings.num_messages_to_publish,
-                                 sleep_time=settings.seconds_between_publishes,
-                                 count_publishers=settings.num_publishers)
-
-            case s if s.startswith('run-range ') and is_numeric_and_positive(
-                s.split()[1]):
-                num_tests = int(s.split()[1])
-                for i in range(num_tests):
-                    print(f"Running test {i + 1} of {num_tests}")
-                    publish_messages(
-                        opts=opts,
-                        count=settings.num_messages_to_publish,
-                        sleep_time=settings.seconds_between_publishes,
-                        count_publishers=settings.num_publishers)
+    try:
+        exit_yes = scenario is not None
+        if scenario:
+            run_scenario(opts, proc_list, scenario)
+        while not exit_yes:
+            result = input(">")
+
+            match result.strip():
+                case 'help':
+                    menu()
+                case 'results':
                     app_state.show_stats = True
-                app_state.show_stats = True
-            case 'reset':
-                app_state.reset_stats = True
-            # case s if s.startswith('set-results-to-file '):
-            #     settings.send_results_to_file = s.split()[1]
-            #     if settings.send_results_to_file:
-            #         print(
-            #             f"Results will be written to: {settings.send_results_to_file}"
-            #         )
-            #     else:
-            #         print("Results will not be written to a file.")
-            #         settings.send_results_to_file = None
-            case s if s.startswith('set-num-subscribers '
-                                   ) and is_numeric_and_positive(s.split()[1]):
-                settings.num_subscribers = int(s.split()[1])
-            case s if s.startswith('set-num-publishers '
-                                   ) and is_numeric_and_positive(s.split()[1]):
-                settings.num_publishers = int(s.split()[1])
-            case s if s.startswith(
-                'set-num-messages ') and is_numeric_and_positive(s.split()[1]):
-                settings.num_messages_to_publish = int(s.split()[1])
-            case s if s.startswith(
-                'set-seconds-between-publishes ') and is_numeric_and_positive(
-                    s, can_be_float=True):
-                settings.seconds_between_publishes = float(s.split()[1])
-            case 'show-settings':
-                pprint(asdict(settings))
-            case s:
-                if not s:
-                    continue
-                print(f"Invalid input: {s}")
+                case s if s.startswith('dashboard ') and s.split()[1] in ('on', 'off'):
+                    app_state.dashboard = s.split()[1] == 'on'
+                case s if s == 'trend' or s.startswith('trend ') and is_numeric_and_positive(s.split()[1]):
+                    args = s.split()[1:]
+                    show_trend(int(args[0]) if args else 10, *args[1:2])
+                case 'quit' | 'exit':
+                    exit_yes = True
+                    break
+                case 'run':
+                    # print(f"Sending:\n{get_message_to_publish()}")
+                    report = publish_messages(opts=opts,
+                                              count=messages_per_publisher(),
+                                              sleep_time=settings.seconds_between_publishes,
+                                              count_publishers=settings.num_publishers)
+                    if run := drain_run(proc_list, settings.drain_timeout):
+                        show_run(run, sum(len(sub.names) for sub in proc_list))
+                        save_run(opts, proc_list, report, run)
 
-        time.sleep(0.01)
+                case s if s.startswith('run-range ') and is_numeric_and_positive(
+                    s.split()[1]):
+                    num_tests = int(s.split()[1])
+                    for i in range(num_tests):
+                        print(f"Running test {i + 1} of {num_tests}")
+                        report = publish_messages(
+                            opts=opts,
+                            count=messages_per_publisher(),
+                            sleep_time=settings.seconds_between_publishes,
+                            count_publishers=settings.num_publishers)
+                        if run := drain_run(proc_list, settings.drain_timeout):
+                            show_run(run, sum(len(sub.names) for sub in proc_list))
+                            save_run(opts, proc_list, report, run, label=f"{i + 1} of {num_tests}")
+                    app_state.show_stats = True
+                case s if s == 'run-results' or (s.startswith('run-results ') and s.split()[1].isnumeric()):
+                    run_id = int(s.split()[1]) if len(s.split()) > 1 else app_state.last_run_id
+                    if run_id in results.runs:
+                        show_run(results.runs[run_id], sum(len(sub.names) for sub in proc_list), per_subscriber=True)
+                    else:
+                        print(f"No results kept for run {run_id}.")
+                case 'find-max-rate':
+                    find_max_rate(opts, proc_list)
+                case s if s.startswith('run-scenario ') and Path(s.split(maxsplit=1)[1]).is_file():
+                    run_scenario(opts, proc_list, Scenario.load(s.split(maxsplit=1)[1]))
+                case 'sync-clocks':
+                    sync_clocks(opts, proc_list)
+                case 'reset':
+                    app_state.reset_stats = True
+                case s if s.startswith('set-results-to-file '):
+                    filename = s.split(maxsplit=1)[1]
+                    set_results_store(None if filename == 'off' else filename)
+                    if settings.send_results_to_file:
+                        print(f"Results will be written to: {settings.send_results_to_file}")
+                    else:
+                        print("Results will not be written to a file.")
+                case s if s.startswith('set-export-dir '):
+                    directory = s.split(maxsplit=1)[1]
+                    settings.export_dir = None if directory == 'off' else directory
+                case s if s == 'list-runs' or s.startswith('list-runs ') and is_numeric_and_positive(s.split()[1]):
+                    list_runs(int(s.split()[1]) if len(s.split()) > 1 else 10)
+                case s if s.startswith('save-baseline ') and len(s.split()) in (2, 3):
+                    save_baseline(*s.split()[1:])
+                case s if s.startswith('compare ') and len(s.split()) in (2, 3):
+                    compare(*s.split()[1:])
+                case s if s.startswith('set-num-subscribers '
+                                       ) and is_numeric_and_positive(s.split()[1]):
+                    settings.num_subscribers = int(s.split()[1])
+                case s if s.startswith('set-subscribers-per-process '
+                                       ) and is_numeric_and_positive(s.split()[1]):
+                    settings.subscribers_per_process = int(s.split()[1])
+                case s if s.startswith('set-subscriber-start ') and s.split()[1] in START_MODES:
+                    settings.subscriber_start = s.split()[1]
+                case s if s.startswith('set-startup-parallelism '
+                                       ) and is_numeric_and_positive(s.split()[1]):
+                    settings.startup_parallelism = int(s.split()[1])
+                case s if s.startswith('set-subscription-timeout '
+                                       ) and is_numeric_and_positive(s.split()[1], can_be_float=True):
+                    settings.subscription_timeout = float(s.split()[1])
+                case s if s.startswith('set-num-publishers '
+                                       ) and is_numeric_and_positive(s.split()[1]):
+                    settings.num_publishers = int(s.split()[1])
+                    connect_publisher_pool(opts)
+                case s if s.startswith(
+                    'set-num-messages ') and is_numeric_and_positive(s.split()[1]):
+                    settings.num_messages_to_publish = int(s.split()[1])
+                case s if s.startswith(
+                    'set-seconds-between-publishes ') and is_numeric_and_positive(
+                        s, can_be_float=True):
+                    settings.seconds_between_publishes = float(s.split()[1])
+                case s if s.startswith('set-pacing ') and s.split()[1] in PACING_MODES:
+                    settings.pacing_mode = s.split()[1]
+                case s if s.startswith(
+                    'set-spin-threshold ') and is_numeric_and_positive(
+                        s.split()[1], can_be_float=True):
+                    settings.spin_threshold = float(s.split()[1])
+                case s if s.startswith('set-publisher-engine ') and s.split()[1] in PUBLISHER_ENGINES:
+                    settings.publisher_engine = s.split()[1]
+                    connect_publisher_pool(opts)
+                case s if s.startswith('set-num-publisher-processes '
+                                       ) and is_numeric_and_positive(s.split()[1]):
+                    settings.num_publisher_processes = int(s.split()[1])
+                    if settings.publisher_engine == "process":
+                        connect_publisher_pool(opts)
+                case s if s.startswith('set-aggregate-interval-ms ') and s.split()[1].isnumeric():
+                    settings.aggregate_interval_ms = int(s.split()[1])
+                case s if s.startswith('set-subscriber-cpu ') and s.split()[1] in ('on', 'off'):
+                    settings.report_subscriber_cpu = s.split()[1] == 'on'
+                case s if s.startswith('set-payload-phasors ') and is_numeric_and_positive(s.split()[1]):
+                    settings.payload_phasors = int(s.split()[1])
+                case s if s.startswith('set-search-trial-seconds ') and is_numeric_and_positive(
+                        s.split()[1], can_be_float=True):
+                    settings.search_trial_seconds = float(s.split()[1])
+                case s if s.startswith('set-search-max-p99-ms ') and is_numeric_and_positive(
+                        s.split()[1], can_be_float=True):
+                    settings.search_max_p99_ms = float(s.split()[1])
+                case s if s.startswith('set-search-max-loss-pct ') and s.split()[1].replace('.', '', 1).isnumeric():
+                    settings.search_max_loss_pct = float(s.split()[1])
+                case s if s.startswith('set-warmup-messages ') and s.split()[1].isnumeric():
+                    settings.warmup_messages = int(s.split()[1])
+                case s if s.startswith('set-warmup-seconds ') and s.split()[1].replace('.', '', 1).isnumeric():
+                    settings.warmup_seconds = float(s.split()[1])
+                case s if s.startswith('set-steady-state ') and s.split()[1] in ('on', 'off'):
+                    settings.steady_state = s.split()[1] == 'on'
+                case s if s.startswith('set-drain-timeout '
+                                       ) and is_numeric_and_positive(s.split()[1], can_be_float=True):
+                    settings.drain_timeout = float(s.split()[1])
+                case s if s.startswith('set-run-seconds ') and s.split()[1].replace('.', '', 1).isnumeric():
+                    settings.run_seconds = float(s.split()[1])
+                case s if s.startswith('set-window-seconds ') and is_numeric_and_positive(
+                        s.split()[1], can_be_float=True):
+                    settings.window_seconds = float(s.split()[1])
+                    results.set_window()
+                case s if s.startswith('set-dashboard-seconds ') and is_numeric_and_positive(
+                        s.split()[1], can_be_float=True):
+                    settings.dashboard_seconds = float(s.split()[1])
+                case s if s.startswith('set-window-detail ') and s.split()[1] in ('on', 'off'):
+                    settings.window_detail = s.split()[1] == 'on'
+                    results.set_window()
+                case s if s.startswith('set-checkpoint-seconds ') and is_numeric_and_positive(
+                        s.split()[1], can_be_float=True):
+                    settings.checkpoint_seconds = float(s.split()[1])
+                case s if s.startswith('set-timeseries-file '):
+                    filename = s.split(maxsplit=1)[1]
+                    set_timeseries_file(None if filename == 'off' else filename)
+                case 'show-settings':
+                    pprint(asdict(settings))
+                case s:
+                    if not s:
+                        continue
+                    print(f"Invalid input: {s}")
 
-    app_state.main_running = False
-    for proc in proc_list:
-        proc.terminate()
+            time.sleep(0.01)
+    finally:
+        app_state.main_running = False
+        for sub in proc_list:
+            sub.proc.terminate()
+        close_publisher_pool()
+        set_timeseries_file(None)
+        set_results_store(None)
 
 if __name__ == '__main__':
     _main()
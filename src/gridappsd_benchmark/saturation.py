@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+"""Search for the highest publish rate the message bus sustains.
+
+The search runs one trial per rate.  While trials pass the rate doubles.  After the
+first failure it bisects between the best passing rate and the lowest failing one,
+and stops once they are within ``tolerance`` of each other.  When the starting rate
+already fails, the rate halves until a trial passes.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable
+
+from gridappsd_benchmark.histogram import format_ns
+
+
+@dataclass
+class Trial:
+    requested_rate: float
+    achieved_rate: float
+    bytes_per_second: float
+    loss_pct: float
+    corrected_p99_ns: int
+    # Why the trial did not sustain its rate, None when it did.
+    failure: str | None = None
+
+    @property
+    def passed(self) -> bool:
+        return self.failure is None
+
+    def __str__(self) -> str:
+        return (f"requested {self.requested_rate:.1f} msgs/s, achieved {self.achieved_rate:.1f} msgs/s, "
+                f"{self.bytes_per_second / 1024:.1f} KiB/s, {self.loss_pct:.2f}% lost, "
+                f"corrected p99: {format_ns(self.corrected_p99_ns)}: {self.failure or 'sustained'}")
+
+
+def search_max_rate(run_trial: Callable[[float], Trial], start_rate: float, max_trials: int = 12,
+                    tolerance: float = 0.05) -> tuple[Trial | None, list[Trial]]:
+    """Return the passing trial with the highest rate, None if none passed, and every trial run."""
+    trials: list[Trial] = []
+    best: Trial | None = None
+    lowest_failure: float | None = None
+    rate = start_rate
+    while len(trials) < max_trials:
+        trial = run_trial(rate)
+        trials.append(trial)
+        if trial.passed:
+            if best is None or rate > best.requested_rate:
+                best = trial
+        elif lowest_failure is None or rate < lowest_failure:
+            lowest_failure = rate
+        if lowest_failure is None:
+            rate *= 2
+        elif best is None:
+            rate = lowest_failure / 2
+        elif lowest_failure - best.requested_rate <= tolerance * best.requested_rate:
+            break
+        else:
+            rate = (best.requested_rate + lowest_failure) / 2
+    return best, trials
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+"""Scenario files describing a matrix of test cells to run without the menu.
+
+A scenario is a JSON object.  ``subscribers``, ``publishers``, ``rates`` (aggregate
+msgs/s), ``payload_phasors`` and ``durations`` (seconds) are each a number or a list of
+numbers, and every combination of them is one cell.  ``settings`` overrides any other
+field of the harness settings for the whole scenario, ``warmup_seconds`` of traffic is
+published before each cell is measured and ``cooldown_seconds`` is the longest wait for
+messages still in flight afterwards.  One JSON line per cell is written to ``output``.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import itertools
+import json
+from pathlib import Path
+from typing import Iterator
+
+
+@dataclass
+class Cell:
+    subscribers: int
+    publishers: int
+    rate: float
+    payload_phasors: int
+    duration: float
+
+
+@dataclass
+class Scenario:
+    name: str
+    subscribers: list[int]
+    publishers: list[int]
+    rates: list[float]
+    payload_phasors: list[int] = field(default_factory=lambda: [14])
+    durations: list[float] = field(default_factory=lambda: [10.0])
+    warmup_seconds: float = 2.0
+    cooldown_seconds: float = 5.0
+    settings: dict = field(default_factory=dict)
+    output: str = ""
+
+    @classmethod
+    def load(cls, path: str | Path) -> Scenario:
+        path = Path(path)
+        spec = json.loads(path.read_text())
+        unknown = set(spec) - set(cls.__dataclass_fields__)
+        if unknown:
+            raise ValueError(f"Unknown scenario fields in {path}: {', '.join(sorted(unknown))}")
+        spec.setdefault("name", path.stem)
+        spec.setdefault("output", str(path.with_suffix(".results.jsonl")))
+        for key in ("subscribers", "publishers", "rates", "payload_phasors", "durations"):
+            if key in spec and not isinstance(spec[key], list):
+                spec[key] = [spec[key]]
+        return cls(**spec)
+
+    def cells(self) -> Iterator[Cell]:
+        # Subscribers vary slowest, changing them means starting or stopping processes.
+        for values in itertools.product(self.subscribers, self.publishers, self.rates, self.payload_phasors,
+                                        self.durations):
+            yield Cell(*values)
+
+    @property
+    def num_cells(self) -> int:
+        return (len(self.subscribers) * len(self.publishers) * len(self.rates) * len(self.payload_phasors) *
+                len(self.durations))
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+import time
+
+from gridappsd_benchmark.histogram import LatencyHistogram, NS_PER_SECOND, format_ns
+
+PACING_MODES = ("sleep", "spin", "hybrid")
+
+
+@dataclass
+class ScheduleReport:
+    sent: int
+    requested_rate: float
+    achieved_rate: float
+    lag: LatencyHistogram
+    # Warm-up messages included in sent.
+    warmup: int = 0
+
+    def __str__(self) -> str:
+        warmup = f" ({self.warmup} warm-up)" if self.warmup else ""
+        return (f"Sent {self.sent} messages{warmup}: requested {self.requested_rate:.1f} msgs/s, "
+                f"achieved {self.achieved_rate:.1f} msgs/s, schedule lag p50: "
+                f"{format_ns(self.lag.percentile(50))}, p99: {format_ns(self.lag.percentile(99))}, "
+                f"max: {format_ns(self.lag.max)}")
+
+    @classmethod
+    def combine(cls, reports: list[ScheduleReport], requested_rate: float) -> ScheduleReport:
+        """Combine the reports of schedulers that ran concurrently over the same span."""
+        lag = LatencyHistogram()
+        for report in reports:
+            lag.merge(report.lag)
+        return cls(sent=sum(r.sent for r in reports),
+                   requested_rate=requested_rate,
+                   achieved_rate=sum(r.achieved_rate for r in reports),
+                   lag=lag,
+                   warmup=sum(r.warmup for r in reports))
+
+
+class RateScheduler:
+    """Open-loop scheduler releasing event ``i`` at ``start + i * interval``.
+
+    Deadlines are absolute, so time spent sending never pushes later events back;
+    an event that is already late is released immediately and its lag recorded.
+    ``hybrid`` pacing sleeps until ``spin_threshold`` seconds before a deadline and
+    busy-waits the rest, which avoids the coarse wake-ups of ``time.sleep`` without
+    spinning for the whole interval.
+    """
+
+    def __init__(self, interval: float, mode: str = "hybrid", spin_threshold: float = 0.002):
+        if mode not in PACING_MODES:
+            raise ValueError(f"Unknown pacing mode {mode}, expected one of {PACING_MODES}")
+        self.interval_ns = max(1, round(interval * NS_PER_SECOND))
+        self.mode = mode
+        self.spin_threshold_ns = round(spin_threshold * NS_PER_SECOND)
+        self.lag = LatencyHistogram()
+        self.start_ns = 0
+        self.sent = 0
+        self._first_release_ns = 0
+        self._last_release_ns = 0
+
+    @property
+    def requested_rate(self) -> float:
+        return NS_PER_SECOND / self.interval_ns
+
+    def start(self, start_ns: int | None = None):
+        self.start_ns = time.perf_counter_ns() if start_ns is None else start_ns
+        self.sent = 0
+        self.lag.reset()
+
+    def deadline(self, index: int) -> int:
+        return self.start_ns + index * self.interval_ns
+
+    def wait(self, index: int) -> int:
+        """Block until event ``index`` is due and return its deadline."""
+        deadline = self.deadline(index)
+        now = time.perf_counter_ns()
+        if self.mode != "spin":
+            remaining = deadline - now
+            if self.mode == "hybrid":
+                remaining -= self.spin_threshold_ns
+            if remaining > 0:
+                time.sleep(remaining / NS_PER_SECOND)
+            now = time.perf_counter_ns()
+        while self.mode != "sleep" and now < deadline:
+            now = time.perf_counter_ns()
+        self._released(deadline, now)
+        return deadline
+
+    async def wait_async(self, index: int) -> int:
+        """Like ``wait`` but yields to the event loop instead of sleeping the thread."""
+        deadline = self.deadline(index)
+        now = time.perf_counter_ns()
+        if self.mode != "spin":
+            remaining = deadline - now
+            if self.mode == "hybrid":
+                remaining -= self.spin_threshold_ns
+            if remaining > 0:
+                await asyncio.sleep(remaining / NS_PER_SECOND)
+            now = time.perf_counter_ns()
+        while self.mode != "sleep" and now < deadline:
+            now = time.perf_counter_ns()
+        self._released(deadline, now)
+        return deadline
+
+    def _released(self, deadline: int, now: int):
+        if self.sent == 0:
+            self._first_release_ns = now
+        self._last_release_ns = now
+        self.sent += 1
+        self.lag.record(now - deadline)
+
+    def report(self, requested_rate: float | None = None) -> ScheduleReport:
+        span = self._last_release_ns - self._first_release_ns
+        achieved = (self.sent - 1) * NS_PER_SECOND / span if self.sent > 1 and span > 0 else 0.0
+        return ScheduleReport(sent=self.sent,
+                              requested_rate=self.requested_rate if requested_rate is None else requested_rate,
+                              achieved_rate=achieved,
+                              lag=self.lag.copy())
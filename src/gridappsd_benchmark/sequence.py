@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from __future__ import annotations
+
+from dataclasses import dataclass, fields
+
+
+@dataclass
+class SequenceCounts:
+    # Distinct messages received.
+    unique: int = 0
+    duplicates: int = 0
+    # Messages that arrived after a later message from the same publisher.
+    reordered: int = 0
+    # Sum over publishers of the highest sequence number seen plus one, the number of
+    # messages that should have arrived so far if none were lost.
+    span: int = 0
+
+    @property
+    def gaps(self) -> int:
+        return self.span - self.unique
+
+    def merge(self, other: SequenceCounts):
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    def reset(self):
+        for f in fields(self):
+            setattr(self, f.name, 0)
+
+    def as_tuple(self) -> tuple[int, ...]:
+        return tuple(getattr(self, f.name) for f in fields(self))
+
+
+class SequenceTracker:
+    """Detects gaps, duplicates and reordering in per-publisher sequence numbers.
+
+    Sequence numbers start at 0 for every publisher.  Only the last ``window`` sequence
+    numbers of each publisher are remembered, as a bitmask, so a duplicate of a message
+    older than that is counted as a reordered message instead.
+    """
+
+    def __init__(self, counts: SequenceCounts | None = None, window: int = 1024,
+                 publisher_counts: dict[int, SequenceCounts] | None = None):
+        self.counts = SequenceCounts() if counts is None else counts
+        self.window = window
+        self._mask = (1 << window) - 1
+        # Counts per publisher, shared with other trackers to total each publisher over them.
+        self.publisher_counts = publisher_counts
+        # publisher -> [highest sequence seen, bitmask of received sequences below it,
+        #               that publisher's counts or None]
+        self._publishers: dict[int, list] = {}
+
+    def record(self, publisher: int, seq: int):
+        state = self._publishers.get(publisher)
+        if state is None:
+            by_publisher = None
+            if self.publisher_counts is not None:
+                by_publisher = self.publisher_counts.setdefault(publisher, SequenceCounts())
+            state = self._publishers[publisher] = [-1, 0, by_publisher]
+        highest, received, by_publisher = state
+        targets = (self.counts,) if by_publisher is None else (self.counts, by_publisher)
+        if seq > highest:
+            shift = seq - highest
+            state[0] = seq
+            state[1] = ((received << shift) | 1) & self._mask if shift < self.window else 1
+            for counts in targets:
+                counts.span += shift
+                counts.unique += 1
+        elif highest - seq >= self.window:
+            for counts in targets:
+                counts.unique += 1
+                counts.reordered += 1
+        else:
+            bit = 1 << (highest - seq)
+            if received & bit:
+                for counts in targets:
+                    counts.duplicates += 1
+            else:
+                state[1] = received | bit
+                for counts in targets:
+                    counts.unique += 1
+                    counts.reordered += 1
+
+    def forget(self, publisher: int):
+        """Drop the state kept for ``publisher`` once it has sent its last message.
+
+        Its counts so far stay in ``counts`` and in ``publisher_counts``.
+        """
+        self._publishers.pop(publisher, None)
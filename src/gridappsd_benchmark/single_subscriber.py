@@ -10,45 +10,244 @@
 #
 # ===----------------------------------------------------------------------===
 # }}}
-from datetime import datetime
+import os
+import signal
 import sys
+import threading
 import time
+from dataclasses import dataclass, field
+
+# Taken before the client stack is imported, to report how long importing it takes.
+STARTED_NS = time.time_ns()
 
 from gridappsd import GridAPPSD
 
+from gridappsd_benchmark.clock import ClockResponder, clock_topics
+from gridappsd_benchmark.histogram import LatencyHistogram
+from gridappsd_benchmark.protocol import (CPU_REPORT, END_OF_RUN_REPORT, KIND_CPU, KIND_END_OF_RUN, KIND_SENTINEL,
+                                          KIND_SNAPSHOT, SENTINEL_REPORT, RecordWriter, encode_ready_line,
+                                          encode_snapshot)
+from gridappsd_benchmark.readiness import is_sentinel
+from gridappsd_benchmark.resources import raise_open_file_limit
+from gridappsd_benchmark.sequence import SequenceCounts, SequenceTracker
 
-subscriber_name = 'subscriber'
-def on_message(header: dict, message: dict):
-    # print(f"Received: {message}")
-    ts_now = datetime.utcnow().timestamp()
-    taken = ts_now - message['start']
-    sys.stdout.write(','.join([subscriber_name, str(message['start']), str(ts_now), str(taken)]) + "\n")
-    sys.stdout.flush()
+IMPORTED_NS = time.time_ns()
 
-if __name__ == '__main__':
+
+@dataclass
+class RunAggregate:
+    """What a logical subscriber received in one run since its last snapshot."""
+    raw: LatencyHistogram = field(default_factory=LatencyHistogram)
+    corrected: LatencyHistogram = field(default_factory=LatencyHistogram)
+    bytes: int = 0
+    # Keeps its per-publisher state between snapshots, only its counts start over.
+    tracker: SequenceTracker = field(default_factory=SequenceTracker)
+    # The publishers whose end-of-run marker arrived.
+    ended: set[int] = field(default_factory=set)
+
+
+class LogicalSubscriber:
+    def __init__(self, index: int, writer: RecordWriter, clock: ClockResponder, aggregate: bool = False):
+        self.index = index
+        self.writer = writer
+        self.clock = clock
+        self.aggregate = aggregate
+        self._lock = threading.Lock()
+        self._runs: dict[int, RunAggregate] = {}
+        # Held from taking snapshots until they are written, so nothing overtakes them.
+        self._send_lock = threading.Lock()
+        self.received = 0
+
+    def on_message(self, header: dict, message: dict):
+        # print(f"Received: {message}")
+        received_ns = self.clock.now_ns()
+        sent_ns = message['start']
+        if is_sentinel(message):
+            # Frames only follow the ready line, the harness keeps sending sentinels until one is reported.
+            if self.writer.started:
+                self.writer.write_frame(KIND_SENTINEL, SENTINEL_REPORT.pack(self.index, sent_ns, received_ns))
+            return
+        if 'end' in message:
+            if self.writer.started:
+                # What arrived before the marker has to reach the harness before it.
+                marker = END_OF_RUN_REPORT.pack(self.index, message['run'], message['publisher'])
+                if self.aggregate:
+                    with self._lock:
+                        run = self._runs.setdefault(message['run'], RunAggregate())
+                        run.ended.add(message['publisher'])
+                        finished = len(run.ended) >= message['publishers']
+                    self.send_snapshots(end_of_run=marker, finished_run=message['run'] if finished else None)
+                else:
+                    self.writer.flush()
+                    self.writer.write_frame(KIND_END_OF_RUN, marker)
+            return
+        # Corrected latency is measured from the scheduled send time rather than the actual one.
+        intended_ns = message.get('intended', sent_ns)
+        size = int(header.get('content-length', 0)) or len(message.get('payload', ''))
+        self.received += 1
+        if message['seq'] < 0:
+            # Warm-up message, only its processing cost counts.
+            return
+        if self.aggregate:
+            with self._lock:
+                run = self._runs.get(message['run'])
+                if run is None:
+                    run = self._runs[message['run']] = RunAggregate()
+                run.raw.record(received_ns - sent_ns)
+                run.corrected.record(received_ns - intended_ns)
+                run.bytes += size
+                run.tracker.record(message['publisher'], message['seq'])
+        else:
+            self.writer.add(self.index, message['run'], message['publisher'], message['seq'], intended_ns, sent_ns,
+                            received_ns, size)
+
+    def snapshots(self) -> list[bytes]:
+        """Encode what each run received since the last snapshot."""
+        taken = []
+        with self._lock:
+            for run_id, run in self._runs.items():
+                if run.raw.count == 0:
+                    continue
+                taken.append((run_id, run.bytes, run.tracker.counts, run.raw, run.corrected))
+                run.raw, run.corrected, run.bytes = LatencyHistogram(), LatencyHistogram(), 0
+                run.tracker.counts = SequenceCounts()
+        return [encode_snapshot(self.index, *values) for values in taken]
+
+    def send_snapshots(self, end_of_run: bytes | None = None, finished_run: int | None = None):
+        """Write a snapshot of each run that received something, then the ``end_of_run`` report if given.
+
+        Once every publisher of ``finished_run`` has ended it, nothing more arrives for it
+        or for the runs before it, so their aggregates are dropped after the snapshot.
+        """
+        with self._send_lock:
+            for payload in self.snapshots():
+                self.writer.write_frame(KIND_SNAPSHOT, payload)
+            if end_of_run is not None:
+                self.writer.write_frame(KIND_END_OF_RUN, end_of_run)
+            if finished_run is not None:
+                with self._lock:
+                    for run_id in [run_id for run_id in self._runs if run_id <= finished_run]:
+                        del self._runs[run_id]
+
+
+def send_snapshots(subscribers: list[LogicalSubscriber]):
+    for subscriber in subscribers:
+        subscriber.send_snapshots()
+
+
+class CpuReporter:
+    """Reports the process's cpu time and messages received since the previous report."""
+
+    def __init__(self, subscribers: list[LogicalSubscriber], writer: RecordWriter):
+        self.subscribers = subscribers
+        self.writer = writer
+        self._last = self._counters()
+
+    def _counters(self) -> tuple[int, int, int]:
+        return time.process_time_ns(), sum(s.received for s in self.subscribers), time.monotonic_ns()
+
+    def report(self):
+        now = self._counters()
+        self.writer.write_frame(KIND_CPU, CPU_REPORT.pack(*(n - p for n, p in zip(now, self._last))))
+        self._last = now
+
+
+def run_periodically(interval: float, shutdown: threading.Event, action):
+    next_call = time.monotonic()
+    while True:
+        next_call += interval
+        if shutdown.wait(max(0.0, next_call - time.monotonic())):
+            return
+        action()
+
+
+def main(argv: list[str] | None = None, started_ns: int = STARTED_NS, imported_ns: int = IMPORTED_NS):
     import argparse
     parser = argparse.ArgumentParser()
-    parser.add_argument("subscriber", type=str)
+    parser.add_argument("subscriber", type=str, nargs="+",
+                        help="Names of the subscribers to host in this process, each gets its own connection.")
     parser.add_argument("--gridappsd-address", default="localhost", type=str)
     parser.add_argument("--gridappsd-port", default=61613, type=int)
     parser.add_argument("--subscription-topic", default="/topic/pmu.data", type=str)
     parser.add_argument("--username", default="system")
     parser.add_argument("--password", default="manager")
-    opts = parser.parse_args()
+    parser.add_argument("--flush-interval-ms", default=10, type=int,
+                        help="Longest time a result record waits before it is written to the harness.")
+    parser.add_argument("--aggregate-interval-ms", default=0, type=int,
+                        help="Aggregate results in this process and send a snapshot this often "
+                        "instead of a record per message, 0 sends records.")
+    parser.add_argument("--cpu-report-interval-ms", default=0, type=int,
+                        help="Report this process's cpu time per message this often, 0 is off.")
+    opts = parser.parse_args(argv)
 
-    #sys.stderr.write("This is before gapps\n")
-    gapps = GridAPPSD(stomp_address=opts.gridappsd_address,
-                      stomp_port=opts.gridappsd_port,
-                      username=opts.username,
-                      password=opts.password)
+    # The harness reads binary frames from stdout, keep that pipe for them alone and send
+    # anything else printed in this process to stderr.
+    results_stream = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    shutdown = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: shutdown.set())
+    writer = RecordWriter(results_stream, flush_interval=opts.flush_interval_ms / 1000, on_closed=shutdown.set)
 
-    #sys.stderr.write("This is after gapps\n")
-    subscriber_name = opts.subscriber
-    gapps.subscribe(opts.subscription_topic, on_message)
+    raise_open_file_limit(len(opts.subscriber) + 256)
+    connections: list[GridAPPSD] = []
+    subscribers: list[LogicalSubscriber] = []
+    clock: ClockResponder | None = None
+    for index, subscriber_name in enumerate(opts.subscriber):
+        #sys.stderr.write("This is before gapps\n")
+        gapps = GridAPPSD(stomp_address=opts.gridappsd_address,
+                          stomp_port=opts.gridappsd_port,
+                          username=opts.username,
+                          password=opts.password)
+
+        #sys.stderr.write("This is after gapps\n")
+        if clock is None:
+            # Every subscriber in the process shares a clock, the first connection answers for it.
+            probe_topic, reply_topic = clock_topics(opts.subscription_topic)
+            clock = ClockResponder(gapps, subscriber_name, reply_topic)
+            gapps.subscribe(probe_topic, clock.on_message)
+        subscriber = LogicalSubscriber(index, writer, clock, aggregate=opts.aggregate_interval_ms > 0)
+        gapps.subscribe(opts.subscription_topic, subscriber.on_message)
+        connections.append(gapps)
+        subscribers.append(subscriber)
     # Requirement for protocol this will kick off to the parent caller.
-    sys.stdout.write("Starting Subscription\n")
-    sys.stdout.flush()
+    results_stream.write(encode_ready_line(started_ns, imported_ns, time.time_ns()))
+    results_stream.flush()
+    writer.start()
+    if opts.aggregate_interval_ms > 0:
+        threading.Thread(target=run_periodically,
+                         args=(opts.aggregate_interval_ms / 1000, shutdown,
+                               lambda: send_snapshots(subscribers)),
+                         daemon=True).start()
+    if opts.cpu_report_interval_ms > 0:
+        threading.Thread(target=run_periodically,
+                         args=(opts.cpu_report_interval_ms / 1000, shutdown,
+                               CpuReporter(subscribers, writer).report),
+                         daemon=True).start()
 
-    while True:
-        #sys.stderr.write("While waiting!\n")
-        time.sleep(0.000001)
+    # Sleep until the harness terminates us or stops reading, the message callbacks run on
+    # the connections' own threads.
+    shutdown.wait()
+    for gapps in connections:
+        gapps.disconnect()
+    try:
+        send_snapshots(subscribers)
+    except (BrokenPipeError, ValueError):
+        pass
+    writer.stop()
+
+
+def run_forked(argv: list[str], stdout, stderr):
+    """Run a subscriber process forked from the harness's fork server, writing to the pipe
+    connections ``stdout`` and ``stderr``."""
+    started_ns = time.time_ns()
+    os.dup2(stdout.fileno(), sys.stdout.fileno())
+    os.dup2(stderr.fileno(), sys.stderr.fileno())
+    stdout.close()
+    stderr.close()
+    # The fork server imported the client stack before forking.
+    main(argv, started_ns, started_ns)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+"""Starting subscriber processes.
+
+A subscriber process either runs ``single_subscriber.py`` in a fresh interpreter, which
+pays for starting Python and importing the client stack every time, or is forked from a
+``multiprocessing`` fork server that imported the client stack once when it started.
+Either way its stdout and stderr are non-blocking pipes the harness reads the same way.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import multiprocessing
+import os
+from pathlib import Path
+import subprocess
+import sys
+
+from gridappsd_benchmark.histogram import format_ns
+from gridappsd_benchmark.single_subscriber import run_forked
+
+START_MODES = ("forkserver", "subprocess")
+
+# Imported once by the fork server.  Every forked process runs the harness's main module
+# again, the harness module is listed so that finds its imports already done.
+PRELOAD = ["gridappsd", "gridappsd_benchmark.run_test", "gridappsd_benchmark.single_subscriber"]
+
+_forkserver: multiprocessing.context.BaseContext | None = None
+
+
+@dataclass
+class StartupTimes:
+    """Wall clock times of a subscriber process's startup, in integer nanoseconds."""
+    # The harness started the process.
+    spawned_ns: int
+    # The process began running, before importing the client stack unless it was forked.
+    started_ns: int = 0
+    imported_ns: int = 0
+    # Every connection in the process subscribed.
+    subscribed_ns: int = 0
+    # The harness read the process's ready line.
+    ready_ns: int = 0
+    # Send time of the first readiness sentinel received by the last of the process's subscriptions.
+    confirmed_ns: int = 0
+
+    @property
+    def process_start_ns(self) -> int:
+        return self.started_ns - self.spawned_ns
+
+    @property
+    def import_ns(self) -> int:
+        return self.imported_ns - self.started_ns
+
+    @property
+    def subscribe_ns(self) -> int:
+        return self.subscribed_ns - self.imported_ns
+
+    @property
+    def propagation_ns(self) -> int:
+        return max(0, self.confirmed_ns - self.subscribed_ns)
+
+
+def _spread(values: list[int]) -> str:
+    values = sorted(values)
+    return f"p50 {format_ns(values[len(values) // 2])}, max {format_ns(values[-1])}"
+
+
+def startup_summary(times: list[StartupTimes]) -> str:
+    elapsed = max(t.ready_ns for t in times) - min(t.spawned_ns for t in times)
+    return (f"{len(times)} subscriber processes ready in {format_ns(elapsed)}, "
+            f"process start: {_spread([t.process_start_ns for t in times])}, "
+            f"import: {_spread([t.import_ns for t in times])}, "
+            f"connect and subscribe: {_spread([t.subscribe_ns for t in times])}")
+
+
+def propagation_summary(times: list[StartupTimes]) -> str:
+    return (f"{len(times)} subscriber processes confirmed, "
+            f"propagation: {_spread([t.propagation_ns for t in times])}")
+
+
+class ForkedProcess:
+    """The parts of ``subprocess.Popen`` the harness uses, for a process forked by the fork server."""
+
+    def __init__(self, process: multiprocessing.process.BaseProcess, stdout, stderr):
+        self._process = process
+        self.pid = process.pid
+        self.stdout = stdout
+        self.stderr = stderr
+
+    @property
+    def returncode(self) -> int | None:
+        return self._process.exitcode
+
+    def poll(self) -> int | None:
+        return self._process.exitcode
+
+    def terminate(self):
+        self._process.terminate()
+
+
+def _fork_server() -> multiprocessing.context.BaseContext:
+    global _forkserver
+    if _forkserver is None:
+        _forkserver = multiprocessing.get_context("forkserver")
+        _forkserver.set_forkserver_preload(PRELOAD)
+    return _forkserver
+
+
+def start_subscriber_process(args: list[str], mode: str = "forkserver") -> subprocess.Popen | ForkedProcess:
+    """Start a subscriber process with the command line ``args`` without waiting for it.
+
+    ``forkserver`` falls back to ``subprocess`` where the platform has no fork server.
+    """
+    if mode == "forkserver" and "forkserver" in multiprocessing.get_all_start_methods():
+        context = _fork_server()
+        stdout, stdout_writer = context.Pipe(duplex=False)
+        stderr, stderr_writer = context.Pipe(duplex=False)
+        process = context.Process(target=run_forked, args=(args, stdout_writer, stderr_writer), daemon=True)
+        process.start()
+        stdout_writer.close()
+        stderr_writer.close()
+        proc = ForkedProcess(process, open(os.dup(stdout.fileno()), 'rb', buffering=0),
+                             open(os.dup(stderr.fileno()), 'rb', buffering=0))
+        stdout.close()
+        stderr.close()
+    else:
+        path = Path(__file__).parent / 'single_subscriber.py'
+        proc = subprocess.Popen([sys.executable, path.as_posix(), *args], stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, env=os.environ.copy())
+    os.set_blocking(proc.stdout.fileno(), False)
+    os.set_blocking(proc.stderr.fileno(), False)
+    return proc
@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+"""SQLite store of run results and comparison of two stored runs.
+
+Every saved run keeps the settings it ran with, a fingerprint of the host and broker,
+the publisher's schedule report, loss counts and the raw and corrected histograms of
+every subscriber and of all of them merged (stored as ``LatencyHistogram.to_array``
+bytes), so later runs can be compared against it at full resolution.
+"""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+import json
+import math
+import os
+import platform
+import sqlite3
+
+from gridappsd_benchmark.histogram import LatencyHistogram, format_ns, rank_sum_z
+from gridappsd_benchmark.scheduler import ScheduleReport
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    label TEXT NOT NULL,
+    started TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    host TEXT NOT NULL,
+    sent INTEGER NOT NULL,
+    requested_rate REAL NOT NULL,
+    achieved_rate REAL NOT NULL,
+    schedule_lag_p99_ns INTEGER NOT NULL,
+    expected INTEGER NOT NULL,
+    received INTEGER NOT NULL,
+    duplicates INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS histograms (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    -- A subscriber name, or 'all' for every subscriber merged.
+    subscriber TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (run_id, subscriber, kind)
+);
+CREATE TABLE IF NOT EXISTS baselines (
+    name TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id)
+);
+"""
+
+# Settings that do not change what a run measures.
+IGNORED_SETTINGS = ("send_results_to_file", "export_dir", "timeseries_file", "dashboard_seconds", "dashboard_rows",
+                    "subscriber_start", "startup_parallelism")
+
+
+def host_fingerprint(broker_address: str, broker_port: int) -> dict:
+    try:
+        from importlib.metadata import version
+        benchmark_version = version("gridappsd-scale")
+    except Exception:
+        benchmark_version = "unknown"
+    return dict(node=platform.node(),
+                platform=platform.platform(),
+                python=platform.python_version(),
+                cpus=os.cpu_count(),
+                benchmark=benchmark_version,
+                broker=f"{broker_address}:{broker_port}")
+
+
+def _histogram_bytes(histogram: LatencyHistogram) -> bytes:
+    return histogram.to_array().tobytes()
+
+
+def _histogram_from_bytes(data: bytes) -> LatencyHistogram:
+    encoded = array('q')
+    encoded.frombytes(data)
+    return LatencyHistogram.from_array(encoded)[0]
+
+
+@dataclass
+class StoredRun:
+    id: int
+    kind: str
+    label: str
+    started: str
+    settings: dict
+    host: dict
+    sent: int
+    requested_rate: float
+    achieved_rate: float
+    schedule_lag_p99_ns: int
+    expected: int
+    received: int
+    duplicates: int
+    bytes: int
+    # Every subscriber merged.
+    raw: LatencyHistogram
+    corrected: LatencyHistogram
+
+    @property
+    def lost(self) -> int:
+        return max(0, self.expected - self.received)
+
+    def __str__(self) -> str:
+        return (f"run {self.id} ({self.kind} {self.label}, {self.started}): {self.sent} sent at "
+                f"{self.achieved_rate:.1f} msgs/s, {self.received} of {self.expected} received, "
+                f"corrected p99: {format_ns(self.corrected.percentile(99))}")
+
+
+class ResultsStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def save_run(self, kind: str, label: str, settings: dict, host: dict, report: ScheduleReport, expected: int,
+                 merged, subscribers: dict) -> int:
+        """Save a run and return its id.
+
+        ``merged`` and the values of ``subscribers`` are per-subscriber statistics with
+        ``raw``, ``corrected``, ``sequence`` and ``bytes`` attributes.
+        """
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO runs (kind, label, started, settings, host, sent, requested_rate, achieved_rate, "
+                "schedule_lag_p99_ns, expected, received, duplicates, bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (kind, label, datetime.now().isoformat(timespec='seconds'), json.dumps(settings), json.dumps(host),
+                 report.sent, report.requested_rate, report.achieved_rate, report.lag.percentile(99), expected,
+                 merged.sequence.unique, merged.sequence.duplicates, merged.bytes))
+            run_id = cursor.lastrowid
+            rows = [(run_id, "all", "raw", _histogram_bytes(merged.raw)),
+                    (run_id, "all", "corrected", _histogram_bytes(merged.corrected))]
+            for name, stats in subscribers.items():
+                rows.append((run_id, name, "raw", _histogram_bytes(stats.raw)))
+                rows.append((run_id, name, "corrected", _histogram_bytes(stats.corrected)))
+            self._conn.executemany("INSERT INTO histograms (run_id, subscriber, kind, data) VALUES (?, ?, ?, ?)",
+                                   rows)
+        return run_id
+
+    def resolve(self, reference: str) -> int | None:
+        """Return the run id a run number or baseline name refers to, None if neither."""
+        if reference.isnumeric():
+            row = self._conn.execute("SELECT id FROM runs WHERE id = ?", (int(reference),)).fetchone()
+        else:
+            row = self._conn.execute("SELECT run_id FROM baselines WHERE name = ?", (reference,)).fetchone()
+        return row[0] if row else None
+
+    def latest(self) -> int | None:
+        row = self._conn.execute("SELECT max(id) FROM runs").fetchone()
+        return row[0]
+
+    def set_baseline(self, name: str, run_id: int):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO baselines (name, run_id) VALUES (?, ?)", (name, run_id))
+
+    def load(self, run_id: int) -> StoredRun:
+        row = self._conn.execute(
+            "SELECT id, kind, label, started, settings, host, sent, requested_rate, achieved_rate, "
+            "schedule_lag_p99_ns, expected, received, duplicates, bytes FROM runs WHERE id = ?", (run_id,)).fetchone()
+        if row is None:
+            raise KeyError(run_id)
+        histograms = dict(self._conn.execute(
+            "SELECT kind, data FROM histograms WHERE run_id = ? AND subscriber = 'all'", (run_id,)).fetchall())
+        return StoredRun(*row[:4], json.loads(row[4]), json.loads(row[5]), *row[6:],
+                         raw=_histogram_from_bytes(histograms["raw"]),
+                         corrected=_histogram_from_bytes(histograms["corrected"]))
+
+    def recent(self, limit: int = 10) -> list[StoredRun]:
+        ids = [row[0] for row in self._conn.execute("SELECT id FROM runs ORDER BY id DESC LIMIT ?", (limit,))]
+        return [self.load(run_id) for run_id in reversed(ids)]
+
+    def baselines(self, run_id: int) -> list[str]:
+        return [row[0] for row in self._conn.execute("SELECT name FROM baselines WHERE run_id = ?", (run_id,))]
+
+
+def _p_value(z: float) -> float:
+    """Two-sided p-value of a standard normal z-score."""
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def _change(before: float, after: float) -> str:
+    return f"{100 * (after - before) / before:+.1f}%" if before else "n/a"
+
+
+def compare_runs(baseline: StoredRun, candidate: StoredRun, alpha: float = 0.01, tolerance: float = 0.05) -> list[str]:
+    """Describe how ``candidate`` differs from ``baseline``.
+
+    A difference is flagged as a regression when it is significant at ``alpha`` and, for
+    rates and latency percentiles, also worse by more than ``tolerance``, so that large
+    runs do not flag differences too small to matter.
+    """
+    lines = [f"baseline:  {baseline}", f"candidate: {candidate}"]
+    for key in sorted(set(baseline.settings) | set(candidate.settings)):
+        before, after = baseline.settings.get(key), candidate.settings.get(key)
+        if key not in IGNORED_SETTINGS and before != after:
+            lines.append(f"setting {key} differs: {before} -> {after}")
+    for key in sorted(set(baseline.host) | set(candidate.host)):
+        if baseline.host.get(key) != candidate.host.get(key):
+            lines.append(f"host {key} differs: {baseline.host.get(key)} -> {candidate.host.get(key)}")
+
+    flag = " REGRESSION" if candidate.achieved_rate < (1 - tolerance) * baseline.achieved_rate else ""
+    lines.append(f"achieved rate: {baseline.achieved_rate:.1f} -> {candidate.achieved_rate:.1f} msgs/s "
+                 f"({_change(baseline.achieved_rate, candidate.achieved_rate)}){flag}")
+
+    # Two-proportion z-test on the share of messages lost.
+    before_loss = baseline.lost / baseline.expected if baseline.expected else 0.0
+    after_loss = candidate.lost / candidate.expected if candidate.expected else 0.0
+    pooled = ((baseline.lost + candidate.lost) / (baseline.expected + candidate.expected)
+              if baseline.expected + candidate.expected else 0.0)
+    se = math.sqrt(pooled * (1 - pooled) * (1 / max(1, baseline.expected) + 1 / max(1, candidate.expected)))
+    p = _p_value((after_loss - before_loss) / se) if se else 1.0
+    flag = " REGRESSION" if after_loss > before_loss and p < alpha else ""
+    lines.append(f"loss: {100 * before_loss:.3f}% -> {100 * after_loss:.3f}% (p={p:.4f}){flag}")
+
+    for name in ("raw", "corrected"):
+        before_hist, after_hist = getattr(baseline, name), getattr(candidate, name)
+        z = rank_sum_z(before_hist, after_hist)
+        p = _p_value(z)
+        before_pct, after_pct = before_hist.percentiles(), after_hist.percentiles()
+        worse = any(after_pct[q] > (1 + tolerance) * before_pct[q] for q in before_pct)
+        flag = " REGRESSION" if z > 0 and p < alpha and worse else ""
+        changes = ", ".join(f"p{q:g}: {format_ns(before_pct[q])} -> {format_ns(after_pct[q])} "
+                            f"({_change(before_pct[q], after_pct[q])})" for q in before_pct)
+        lines.append(f"{name} latency: {changes}, rank-sum p={p:.4f}{flag}")
+    return lines
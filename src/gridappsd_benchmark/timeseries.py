@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from __future__ import annotations
+
+from array import array
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable
+
+from gridappsd_benchmark.histogram import LatencyHistogram, NS_PER_SECOND, format_ns
+from gridappsd_benchmark.sequence import SequenceCounts
+
+
+@dataclass
+class WindowSummary:
+    start_ns: int
+    seconds: float
+    messages: int
+    bytes: int
+    gaps: int
+    duplicates: int
+    # Corrected latency of the messages that arrived in the window.
+    p50_ns: int
+    p99_ns: int
+    max_ns: int
+
+    @property
+    def msgs_per_second(self) -> float:
+        return self.messages / self.seconds
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds
+
+    @property
+    def loss_pct(self) -> float:
+        expected = self.messages + self.gaps
+        return 100 * max(0, self.gaps) / expected if expected > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (f"{self.msgs_per_second:.1f} msgs/s, {self.bytes_per_second / 1024:.1f} KiB/s, "
+                f"p50: {format_ns(self.p50_ns)}, p99: {format_ns(self.p99_ns)}, max: {format_ns(self.max_ns)}, "
+                f"{self.loss_pct:.2f}% lost")
+
+
+class WindowSeries:
+    """Statistics over consecutive fixed windows in constant memory.
+
+    Latencies and bytes are added to the open window as they arrive.  Message, gap and
+    duplicate counts are taken as the change in the cumulative ``SequenceCounts`` passed
+    to ``roll``, so the caller only tracks sequences once.  A closed window is reduced to
+    a ``WindowSummary``, kept in a ring of the last ``capacity`` and passed to ``on_close``.
+    Windows in which nothing arrived are closed too, so stalls show up as empty windows.
+    """
+
+    def __init__(self, window_seconds: float, capacity: int = 1440,
+                 on_close: Callable[[str, WindowSummary], None] | None = None, source: str = "all",
+                 significant_bits: int = 8):
+        self.window_ns = max(1, round(window_seconds * NS_PER_SECOND))
+        self.summaries: deque[WindowSummary] = deque(maxlen=capacity)
+        self.on_close = on_close
+        # What the series covers, passed to on_close.
+        self.source = source
+        self.latency = LatencyHistogram(significant_bits)
+        self.bytes = 0
+        self.start_ns = 0
+        self._baseline = SequenceCounts()
+
+    def record(self, latency_ns: int, size: int):
+        self.latency.record(latency_ns)
+        self.bytes += size
+
+    def merge_encoded(self, latency: array, num_bytes: int):
+        """Add a snapshot's latencies, encoded by ``LatencyHistogram.to_array``, and bytes."""
+        self.latency.merge_encoded(latency)
+        self.bytes += num_bytes
+
+    def rebase(self, counts: SequenceCounts):
+        """Take ``counts`` as the starting point of the open window, after they were reset."""
+        self._baseline = SequenceCounts(*counts.as_tuple())
+
+    def due(self, now_ns: int) -> bool:
+        return self.start_ns == 0 or now_ns >= self.start_ns + self.window_ns
+
+    def roll(self, now_ns: int, counts: SequenceCounts) -> int:
+        """Close every window that ended by ``now_ns`` and return how many were closed."""
+        if self.start_ns == 0:
+            # Windows start on multiples of their length so every series lines up.
+            self.start_ns = now_ns - now_ns % self.window_ns
+            self.rebase(counts)
+            return 0
+        closed = 0
+        while now_ns >= self.start_ns + self.window_ns:
+            baseline = self._baseline
+            pct = self.latency.percentiles((50.0, 99.0))
+            summary = WindowSummary(start_ns=self.start_ns,
+                                    seconds=self.window_ns / NS_PER_SECOND,
+                                    messages=counts.unique - baseline.unique,
+                                    bytes=self.bytes,
+                                    gaps=counts.gaps - baseline.gaps,
+                                    duplicates=counts.duplicates - baseline.duplicates,
+                                    p50_ns=pct[50.0],
+                                    p99_ns=pct[99.0],
+                                    max_ns=self.latency.max)
+            self.summaries.append(summary)
+            if self.on_close:
+                self.on_close(self.source, summary)
+            self.rebase(counts)
+            if self.latency.count:
+                self.latency.reset()
+            self.bytes = 0
+            self.start_ns += self.window_ns
+            closed += 1
+        return closed
+
+
+def is_steady(summaries: list[WindowSummary], tolerance_pct: float) -> bool:
+    """True when every window received messages and their p99 latencies are all within
+    ``tolerance_pct`` of the median of them."""
+    if not summaries or any(summary.messages == 0 for summary in summaries):
+        return False
+    p99s = sorted(summary.p99_ns for summary in summaries)
+    median = p99s[len(p99s) // 2]
+    return p99s[-1] - p99s[0] <= tolerance_pct / 100 * median
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from argparse import Namespace
+import asyncio
+import threading
+
+import pytest
+
+pytest.importorskip("gridappsd")
+
+from gridappsd_benchmark.async_publisher import AsyncPublisherPool, encode_frame, read_frame  # noqa: E402
+
+
+def test_connect_headers_are_not_escaped():
+    frame = encode_frame("CONNECT", {"login": "a:b", "passcode": "c\\d"})
+    assert frame == b"CONNECT\nlogin:a:b\npasscode:c\\d\n\n\x00"
+    frame = encode_frame("SEND", {"destination": "/topic/a:b"}, b"{}")
+    assert frame == b"SEND\ndestination:/topic/a\\cb\n\n{}\x00"
+
+
+class Broker:
+    """Answers the first ``accept`` CONNECT frames with CONNECTED and the rest with ERROR."""
+
+    def __init__(self, accept: int):
+        self.accept = accept
+        self.open = 0
+        self.ready = threading.Event()
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_until_complete, args=(self._serve(),), daemon=True).start()
+        self.ready.wait()
+
+    async def _serve(self):
+        server = await asyncio.start_server(self._client, "127.0.0.1", 0)
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        async with server:
+            await server.serve_forever()
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.open += 1
+        await read_frame(reader)
+        if self.accept > 0:
+            self.accept -= 1
+            writer.write(encode_frame("CONNECTED", {"version": "1.2"}))
+        else:
+            writer.write(encode_frame("ERROR", {"message": "no more"}))
+        await writer.drain()
+        await reader.read()
+        self.open -= 1
+        writer.close()
+
+
+def test_failed_resize_disconnects_the_publishers_it_connected():
+    broker = Broker(accept=3)
+    pool = AsyncPublisherPool(Namespace(gridappsd_address="127.0.0.1", gridappsd_port=broker.port, username="u",
+                                        password="p"))
+    try:
+        with pytest.raises(ConnectionError, match="no more"):
+            pool.resize(5)
+        assert pool.publishers == []
+        for _ in range(100):
+            if broker.open == 0:
+                break
+            threading.Event().wait(0.01)
+        assert broker.open == 0
+        broker.accept = 2
+        assert pool.resize(2) == 2
+    finally:
+        pool.close()
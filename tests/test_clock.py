@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+import pytest
+
+pytest.importorskip("gridappsd")
+
+from gridappsd_benchmark.clock import ClockResponder, clock_topics, estimate_offset  # noqa: E402
+
+MS = 1_000_000
+
+
+def probe(t0: int, offset: int, there: int, processing: int, back: int) -> tuple[int, int, int, int]:
+    """A probe sent at ``t0`` to a subscriber whose clock is ``offset`` ahead."""
+    t1 = t0 + there + offset
+    t2 = t1 + processing
+    return t0, t1, t2, t2 - offset + back
+
+
+def test_symmetric_delays_give_the_exact_offset():
+    estimate = estimate_offset([probe(0, 7 * MS, 2 * MS, MS, 2 * MS)])
+    assert estimate.offset_ns == 7 * MS
+    # Half the round trip, without the time the subscriber spent answering.
+    assert estimate.uncertainty_ns == 2 * MS + 1
+    assert estimate.samples == 1
+
+
+def test_shortest_round_trip_is_trusted():
+    samples = [probe(0, -3 * MS, 10 * MS, MS, 2 * MS),
+               probe(100 * MS, -3 * MS, MS, 5 * MS, MS),
+               probe(200 * MS, -3 * MS, 2 * MS, MS, 20 * MS)]
+    estimate = estimate_offset(samples)
+    assert estimate.offset_ns == -3 * MS
+    assert estimate.uncertainty_ns == MS + 1
+    assert estimate.samples == 3
+
+
+def test_asymmetric_delay_is_within_the_uncertainty():
+    estimate = estimate_offset([probe(0, 5 * MS, 4 * MS, 0, 0)])
+    assert abs(estimate.offset_ns - 5 * MS) <= estimate.uncertainty_ns
+
+
+def test_clock_topics():
+    assert clock_topics("/topic/pmu.data") == ("/topic/pmu.data.clock", "/topic/pmu.data.clock.reply")
+
+
+class Sent(list):
+    def send(self, topic: str, message: dict):
+        self.append((topic, message))
+
+
+def test_responder_answers_probes_and_takes_its_offset():
+    sent = Sent()
+    responder = ClockResponder(sent, "subscriber1", "/topic/reply")
+    responder.on_message({}, dict(probe=4, t0=123))
+    (topic, reply), = sent
+    assert topic == "/topic/reply"
+    assert (reply['probe'], reply['responder'], reply['t0']) == (4, "subscriber1", 123)
+    assert reply['t1'] <= reply['t2']
+    responder.on_message({}, dict(offsets={"subscriber2": 5}))
+    assert responder.offset_ns == 0
+    responder.on_message({}, dict(offsets={"subscriber1": 10 * MS}))
+    assert responder.offset_ns == 10 * MS
+    assert len(sent) == 1
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from types import SimpleNamespace
+
+from gridappsd_benchmark.dashboard import Dashboard
+from gridappsd_benchmark.histogram import NS_PER_SECOND, LatencyHistogram
+from gridappsd_benchmark.sequence import SequenceCounts
+
+MS = 1_000_000
+T0 = 1_700_000_000 * NS_PER_SECOND
+
+
+def row(frame: str, name: str) -> list[str]:
+    return next(line.split() for line in frame.splitlines() if line.startswith(name))
+
+
+def test_frame_shows_the_last_window():
+    dashboard = Dashboard(window_seconds=1.0)
+    stats = SimpleNamespace(sequence=SequenceCounts(), bytes=0, corrected=LatencyHistogram())
+    subscribers = {"subscriber1": stats}
+    dashboard.frame(T0, subscribers, (0.0, 0.0, 0.0))
+    for _ in range(10):
+        dashboard.record("subscriber1", 5 * MS, 100)
+        stats.corrected.record(5 * MS)
+    stats.sequence.unique = stats.sequence.span = 10
+    stats.bytes = 1000
+    frame = dashboard.frame(T0 + NS_PER_SECOND, subscribers, (0.0, 0.0, 0.0))
+    name, rate, _, p50, p99, _, _ = row(frame, "subscriber1")
+    assert float(rate) == 10.0
+    assert p50.startswith("5.0") and p99.startswith("5.0")
+    assert row(frame, "all")[3].startswith("5.0")
+
+
+def test_frame_drawn_late_does_not_show_an_empty_window_as_zero():
+    dashboard = Dashboard(window_seconds=1.0)
+    stats = SimpleNamespace(sequence=SequenceCounts(), bytes=0, corrected=LatencyHistogram())
+    subscribers = {"subscriber1": stats}
+    dashboard.frame(T0, subscribers, (0.0, 0.0, 0.0))
+    dashboard.record("subscriber1", 5 * MS, 100)
+    stats.sequence.unique = stats.sequence.span = 1
+    # Two windows close in this frame, the second one empty.
+    frame = dashboard.frame(T0 + 2 * NS_PER_SECOND, subscribers, (0.0, 0.0, 0.0))
+    for name in ("subscriber1", "all"):
+        assert row(frame, name)[3:5] == ["-", "-"]
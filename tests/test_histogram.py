@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+import random
+
+import pytest
+
+from gridappsd_benchmark.histogram import NS_PER_SECOND, LatencyHistogram, rank_sum_z
+
+
+def values(significant_bits: int):
+    """Every value up to 2 ** 20 around each bucket boundary, and spread above that."""
+    for value in range(1 << (significant_bits + 2)):
+        yield value
+    for power in range(significant_bits + 2, 42):
+        for value in (1 << power) - 1, 1 << power, (1 << power) + 1, 3 << (power - 1):
+            yield value
+
+
+@pytest.mark.parametrize("significant_bits", [2, 5, 8])
+def test_values_below_sub_bucket_count_are_exact(significant_bits):
+    histogram = LatencyHistogram(significant_bits)
+    for value in range(1 << significant_bits):
+        assert histogram._index(value) == value
+        assert histogram._highest_equivalent(value) == value
+
+
+@pytest.mark.parametrize("significant_bits", [2, 5, 8])
+def test_highest_equivalent_bounds_the_value(significant_bits):
+    histogram = LatencyHistogram(significant_bits)
+    for value in values(significant_bits):
+        highest = histogram._highest_equivalent(histogram._index(value))
+        assert value <= highest
+        assert highest - value <= value * 2 ** -(significant_bits - 1)
+
+
+@pytest.mark.parametrize("significant_bits", [2, 5, 8])
+def test_buckets_are_contiguous(significant_bits):
+    histogram = LatencyHistogram(significant_bits, highest_trackable_ns=1 << 30)
+    for index in range(histogram._index(1 << 30)):
+        highest = histogram._highest_equivalent(index)
+        assert histogram._index(highest) == index
+        assert histogram._index(highest + 1) == index + 1
+
+
+def test_percentiles_of_exact_values():
+    histogram = LatencyHistogram()
+    for value in range(1, 101):
+        histogram.record(value)
+    assert histogram.count == 100
+    assert histogram.min == 1
+    assert histogram.max == 100
+    assert histogram.mean == 50.5
+    assert histogram.percentile(50) == 50
+    assert histogram.percentiles((50.0, 99.0, 100.0)) == {50.0: 50, 99.0: 99, 100.0: 100}
+
+
+def test_percentile_is_capped_at_max():
+    histogram = LatencyHistogram()
+    histogram.record(1_000_001)
+    assert histogram.percentile(50) == 1_000_001
+    assert histogram.percentiles() == {p: 1_000_001 for p in (50.0, 90.0, 99.0, 99.9)}
+
+
+def test_record_clamps_out_of_range_values():
+    histogram = LatencyHistogram(highest_trackable_ns=NS_PER_SECOND)
+    histogram.record(-5)
+    histogram.record(10 * NS_PER_SECOND)
+    assert histogram.min == 0
+    assert histogram.max == 10 * NS_PER_SECOND
+    assert histogram.buckets()[0] == (0, 1)
+    assert histogram.buckets()[-1][1] == 1
+
+
+def test_empty_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.percentile(99) == 0
+    assert histogram.percentiles() == {p: 0 for p in (50.0, 90.0, 99.0, 99.9)}
+    assert histogram.buckets() == []
+    assert histogram.summary() == "0 messages"
+
+
+def random_histogram(seed: int, count: int = 1000) -> LatencyHistogram:
+    rng = random.Random(seed)
+    histogram = LatencyHistogram()
+    for _ in range(count):
+        histogram.record(int(rng.lognormvariate(14, 1.5)))
+    return histogram
+
+
+def test_array_round_trip():
+    histogram = random_histogram(1)
+    decoded, offset = LatencyHistogram.from_array(histogram.to_array())
+    assert offset == len(histogram.to_array())
+    assert decoded.to_array() == histogram.to_array()
+    assert (decoded.count, decoded.total, decoded.min, decoded.max) == (histogram.count, histogram.total,
+                                                                        histogram.min, histogram.max)
+
+
+def test_array_round_trip_at_an_offset():
+    first, second = random_histogram(1), random_histogram(2)
+    encoded = first.to_array()
+    encoded.extend(second.to_array())
+    decoded_first, offset = LatencyHistogram.from_array(encoded)
+    assert offset == LatencyHistogram.encoded_end(encoded)
+    decoded_second, end = LatencyHistogram.from_array(encoded, offset)
+    assert end == len(encoded)
+    assert decoded_first.to_array() == first.to_array()
+    assert decoded_second.to_array() == second.to_array()
+
+
+def test_merge_encoded_matches_merge():
+    merged, merged_encoded = random_histogram(1), random_histogram(1)
+    other = random_histogram(2)
+    merged.merge(other)
+    assert merged_encoded.merge_encoded(other.to_array()) == len(other.to_array())
+    assert merged_encoded.to_array() == merged.to_array()
+    assert merged.count == 2000
+
+
+def test_merge_into_empty_takes_min():
+    histogram = LatencyHistogram()
+    other = random_histogram(3)
+    histogram.merge_encoded(other.to_array())
+    assert histogram.min == other.min
+    empty = LatencyHistogram()
+    histogram.merge_encoded(empty.to_array())
+    assert histogram.to_array() == other.to_array()
+
+
+def test_merge_rejects_another_layout():
+    with pytest.raises(ValueError):
+        LatencyHistogram(8).merge(LatencyHistogram(5))
+    with pytest.raises(ValueError):
+        LatencyHistogram(8).merge_encoded(LatencyHistogram(5).to_array())
+
+
+def test_rank_sum_sign():
+    slow = LatencyHistogram()
+    fast = LatencyHistogram()
+    for value in range(100):
+        fast.record(1_000_000 + value)
+        slow.record(2_000_000 + value)
+    assert rank_sum_z(fast, slow) > 3
+    assert rank_sum_z(slow, fast) < -3
+    assert rank_sum_z(fast, fast) == 0.0
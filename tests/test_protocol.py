@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+import io
+
+from gridappsd_benchmark.histogram import LatencyHistogram
+from gridappsd_benchmark.protocol import (END_OF_RUN_REPORT, KIND_END_OF_RUN, KIND_RECORDS, KIND_SNAPSHOT,
+                                          NUM_RECORD_FIELDS, FrameReader, RecordWriter, decode_records,
+                                          decode_snapshot, encode_frame, encode_ready_line, encode_snapshot,
+                                          parse_ready_line)
+from gridappsd_benchmark.sequence import SequenceCounts
+
+
+def test_ready_line_round_trip():
+    line = encode_ready_line(1, 22, 333)
+    assert line.endswith(b"\n")
+    assert parse_ready_line(line) == (1, 22, 333)
+    assert parse_ready_line(line.rstrip(b"\n")) == (1, 22, 333)
+
+
+def test_other_lines_are_not_ready_lines():
+    assert parse_ready_line(b"Traceback (most recent call last):") is None
+    assert parse_ready_line(b"x" + encode_ready_line(1, 2, 3)) is None
+
+
+def test_frames_reassemble_from_single_bytes():
+    frames = [(KIND_RECORDS, b"a" * 100), (KIND_SNAPSHOT, b""), (KIND_END_OF_RUN, b"bc")]
+    stream = b"".join(encode_frame(kind, payload) for kind, payload in frames)
+    reader = FrameReader()
+    received = []
+    for i in range(len(stream)):
+        reader.feed(stream[i:i + 1])
+        received.extend(reader)
+    assert received == frames
+
+
+def test_partial_frame_is_kept_for_the_next_read():
+    frame = encode_frame(KIND_RECORDS, b"0123456789")
+    reader = FrameReader()
+    reader.feed(frame + frame[:5])
+    assert list(reader) == [(KIND_RECORDS, b"0123456789")]
+    assert list(reader) == []
+    reader.feed(frame[5:])
+    assert list(reader) == [(KIND_RECORDS, b"0123456789")]
+
+
+def test_records_round_trip_through_the_writer():
+    stream = io.BytesIO()
+    # A long interval so only a full batch and stop flush.
+    writer = RecordWriter(stream, max_records=2, flush_interval=60.0)
+    rows = [tuple(range(n, n + NUM_RECORD_FIELDS)) for n in (0, 100, 200)]
+    writer.start()
+    for row in rows:
+        writer.add(*row)
+    writer.write_frame(KIND_END_OF_RUN, END_OF_RUN_REPORT.pack(0, 1, 2))
+    writer.stop()
+    reader = FrameReader()
+    reader.feed(stream.getvalue())
+    frames = list(reader)
+    # The first two records were flushed when the batch filled, the marker is written
+    # after them and stop writes the last record.
+    assert [kind for kind, _ in frames] == [KIND_RECORDS, KIND_END_OF_RUN, KIND_RECORDS]
+    columns = [list(column) for column in decode_records(frames[0][1])]
+    columns = [a + list(b) for a, b in zip(columns, decode_records(frames[2][1]))]
+    assert list(zip(*columns)) == rows
+    assert END_OF_RUN_REPORT.unpack(frames[1][1]) == (0, 1, 2)
+
+
+def test_snapshot_round_trip():
+    raw, corrected = LatencyHistogram(), LatencyHistogram()
+    for value in (1_000, 250_000, 3_000_000):
+        raw.record(value)
+        corrected.record(value * 2)
+    sequence = SequenceCounts(unique=3, duplicates=1, reordered=0, span=4)
+    subscriber, run, num_bytes, decoded_sequence, raw_encoded, corrected_encoded = decode_snapshot(
+        encode_snapshot(5, 9, 1234, sequence, raw, corrected))
+    assert (subscriber, run, num_bytes, decoded_sequence) == (5, 9, 1234, sequence)
+    assert raw_encoded == raw.to_array()
+    assert corrected_encoded == corrected.to_array()
+
+
+def test_snapshot_of_empty_histograms():
+    empty = LatencyHistogram()
+    *_, raw_encoded, corrected_encoded = decode_snapshot(encode_snapshot(0, 1, 0, SequenceCounts(), empty, empty))
+    merged = LatencyHistogram()
+    merged.merge_encoded(raw_encoded)
+    merged.merge_encoded(corrected_encoded)
+    assert merged.count == 0
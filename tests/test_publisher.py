@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from argparse import Namespace
+import json
+import time
+
+import pytest
+
+pytest.importorskip("gridappsd")
+
+from gridappsd_benchmark.publisher import (MessageTemplate, PublishPlan, encode_payload,  # noqa: E402
+                                           end_of_run_message, send_scheduled)
+
+
+def test_render_matches_json_dumps():
+    payload = 'pmu "A" 100% µs\n'
+    template = MessageTemplate(3, 12, encode_payload(payload))
+    before = time.time_ns()
+    rendered = template.render(-2, 1_700_000_000_123_456_789)
+    message = json.loads(rendered)
+    assert before <= message['start'] <= time.time_ns()
+    assert rendered == json.dumps(dict(run=3, publisher=12, seq=-2, intended=1_700_000_000_123_456_789,
+                                       start=message['start'], payload=payload)).encode("utf-8")
+
+
+def test_render_fills_in_each_message():
+    template = MessageTemplate(1, 0, encode_payload("x"))
+    first, second = json.loads(template.render(0, 10)), json.loads(template.render(1, 20))
+    assert (first['seq'], first['intended']) == (0, 10)
+    assert (second['seq'], second['intended']) == (1, 20)
+
+
+def test_end_of_run_message():
+    marker = end_of_run_message(3, 12, 100, 4)
+    assert {key: marker[key] for key in ("run", "publisher", "end", "publishers")} == dict(run=3, publisher=12,
+                                                                                          end=100, publishers=4)
+
+
+class Connection(list):
+    def send(self, topic: str, message):
+        self.append(json.loads(message) if isinstance(message, bytes) else message)
+
+
+def test_send_scheduled_interleaves_publishers_and_ends_the_run():
+    plan = PublishPlan(count=3, sleep_time=0.004, total_publishers=2, pacing_mode="spin", spin_threshold=0.0,
+                       first_publisher_id=10, warmup=1, run_id=7)
+    connections = {0: Connection(), 1: Connection()}
+    report = send_scheduled(Namespace(publish_topic="/topic/pmu.data"), plan, connections, "payload")
+    assert (report.sent, report.warmup) == (8, 2)
+    assert report.requested_rate == plan.requested_rate == 500.0
+    for index, sent in connections.items():
+        *messages, marker = sent
+        assert [message['seq'] for message in messages] == [-1, 0, 1, 2]
+        assert {message['publisher'] for message in messages} == {10 + index}
+        assert {message['run'] for message in messages} == {7}
+        assert (marker['run'], marker['publisher'], marker['end'], marker['publishers']) == (7, 10 + index, 3, 2)
+    # Publisher 1 is scheduled half an interval after publisher 0.
+    intended = [message['intended'] for sent in connections.values() for message in sent[:-1]]
+    assert intended[4] - intended[0] == 2_000_000
+    assert intended[1] - intended[0] == 4_000_000
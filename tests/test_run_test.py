@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from argparse import Namespace
+import time
+
+import pytest
+
+pytest.importorskip("gridappsd")
+
+from gridappsd_benchmark import run_test  # noqa: E402
+from gridappsd_benchmark.histogram import NS_PER_SECOND, LatencyHistogram  # noqa: E402
+from gridappsd_benchmark.scheduler import ScheduleReport  # noqa: E402
+
+MS = 1_000_000
+
+
+def receive(run_id: int, subscriber: str, publisher: int, seqs: range, latency_ns: int):
+    """What the results thread does with a subscriber's records of ``run_id``."""
+    results = run_test.results
+    with results.lock:
+        stats, run_stats = results.stats_for(subscriber), results.runs[run_id].stats_for(subscriber)
+        for seq in seqs:
+            for s in (stats, run_stats):
+                s.raw.record(latency_ns)
+                s.corrected.record(latency_ns)
+            results.trackers[subscriber].record(publisher, seq)
+            results.runs[run_id].trackers[subscriber].record(publisher, seq)
+
+
+@pytest.fixture
+def harness(monkeypatch):
+    monkeypatch.setattr(run_test, "results", run_test.Results())
+    monkeypatch.setattr(run_test, "app_state", run_test.AppState())
+    monkeypatch.setattr(run_test, "settings", run_test.Settings())
+    run_test.settings.num_publishers = 1
+    return [Namespace(names=["sub0"])]
+
+
+def test_trial_latency_leaves_out_the_warm_up(harness, monkeypatch):
+    def publish_messages(opts, count, sleep_time, count_publishers):
+        app_state = run_test.app_state
+        run_id = app_state.last_run_id = app_state.next_run_id
+        run = run_test.results.start_run(run_id, count_publishers, count)
+        # Slow messages until steady state is reached, then the run's latency starts over.
+        receive(run_id, "sub0", 0, range(5), 1000 * MS)
+        run_test.results.reset_latency(run_id)
+        receive(run_id, "sub0", 0, range(5, count), 2 * MS)
+        run.ended["sub0"] = {0}
+        return ScheduleReport(sent=count, requested_rate=100.0, achieved_rate=100.0, lag=LatencyHistogram())
+
+    monkeypatch.setattr(run_test, "publish_messages", publish_messages)
+    report, run, merged, expected = run_test.measure(Namespace(), harness, rate=100.0, duration=0.1,
+                                                     drain_timeout=1.0)
+    assert expected == 10
+    assert merged.raw.count == merged.corrected.count == 5
+    assert merged.corrected.max < 3 * MS
+    assert merged.sequence.unique == 10
+    assert set(run.subscribers) == {"sub0"}
+    # The totals since the reset still have the messages before steady state.
+    assert run_test.results.merged().corrected.max >= 1000 * MS
+
+    trial = run_test.run_trial(Namespace(), harness, 100.0)
+    assert trial.corrected_p99_ns < 3 * MS
+    assert trial.loss_pct == 0.0
+
+
+def test_publishers_are_dropped_once_every_subscriber_ended_them(harness):
+    results = run_test.results
+    results.start_run(1, 2, 3)
+    for subscriber in ("sub0", "sub1"):
+        receive(1, subscriber, 0, range(3), MS)
+        receive(1, subscriber, 1, range(3), MS)
+    assert set(results.publisher_counts) == {0, 1}
+    results.publisher_series(1)
+    running = ["sub0", "sub1"]
+    with results.lock:
+        results.end_of_run(1, 0, "sub0", running)
+        assert set(results.publisher_counts) == {0, 1}
+        results.end_of_run(1, 0, "sub1", running)
+        assert set(results.publisher_counts) == {1}
+        # Publisher 1 has a series, its counts go with it.
+        results.end_of_run(1, 1, "sub0", running)
+        results.end_of_run(1, 1, "sub1", running)
+    assert results.ended_publishers == {1}
+    assert results.runs[1].undrained(running) == []
+    assert results.merged().sequence.unique == 12
+    with results.lock:
+        now_ns = time.time_ns()
+        results.roll(now_ns)
+        results.roll(now_ns + 2 * round(run_test.settings.window_seconds * NS_PER_SECOND))
+    assert results.publisher_counts == {} and results.publisher_windows == {}
+
+    results.start_run(2, 1, 3)
+    receive(2, "sub0", 2, range(3), MS)
+    results.publisher_series(2)
+    results.reset()
+    assert results.publisher_counts == {} and results.publisher_windows == {}
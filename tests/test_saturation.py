@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from gridappsd_benchmark.saturation import Trial, search_max_rate
+
+
+def bus(capacity: float):
+    """A trial runner for a bus that sustains up to ``capacity`` msgs/s."""
+
+    def run_trial(rate: float) -> Trial:
+        return Trial(requested_rate=rate,
+                     achieved_rate=min(rate, capacity),
+                     bytes_per_second=0.0,
+                     loss_pct=0.0,
+                     corrected_p99_ns=0,
+                     failure=None if rate <= capacity else "publishers could not keep up")
+
+    return run_trial
+
+
+def test_doubles_then_bisects_to_the_tolerance():
+    best, trials = search_max_rate(bus(1000.0), start_rate=100.0, max_trials=20, tolerance=0.05)
+    rates = [trial.requested_rate for trial in trials]
+    assert rates[:5] == [100.0, 200.0, 400.0, 800.0, 1600.0]
+    # Every later rate lies between the best pass and the lowest failure so far.
+    assert rates[5] == 1200.0
+    assert best.passed
+    assert 1000.0 / 1.05 <= best.requested_rate <= 1000.0
+    assert all(trial.passed == (trial.requested_rate <= 1000.0) for trial in trials)
+    assert len(trials) < 20
+
+
+def test_halves_when_the_start_rate_fails():
+    best, trials = search_max_rate(bus(30.0), start_rate=100.0, max_trials=20)
+    assert [trial.requested_rate for trial in trials[:3]] == [100.0, 50.0, 25.0]
+    assert 30.0 / 1.05 <= best.requested_rate <= 30.0
+
+
+def test_stops_after_max_trials():
+    best, trials = search_max_rate(bus(float("inf")), start_rate=1.0, max_trials=4)
+    assert [trial.requested_rate for trial in trials] == [1.0, 2.0, 4.0, 8.0]
+    assert best.requested_rate == 8.0
+
+
+def test_no_rate_passes():
+    best, trials = search_max_rate(bus(0.0), start_rate=10.0, max_trials=5)
+    assert best is None
+    assert [trial.requested_rate for trial in trials] == [10.0, 5.0, 2.5, 1.25, 0.625]
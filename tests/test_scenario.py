@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+import json
+
+import pytest
+
+from gridappsd_benchmark.scenario import Cell, Scenario
+
+
+def write(tmp_path, spec: dict, name: str = "nightly.json"):
+    path = tmp_path / name
+    path.write_text(json.dumps(spec))
+    return path
+
+
+def test_defaults(tmp_path):
+    scenario = Scenario.load(write(tmp_path, dict(subscribers=[1, 10], publishers=2, rates=100)))
+    assert scenario.name == "nightly"
+    # The results go next to the scenario file, wherever the harness runs from.
+    assert scenario.output == str(tmp_path / "nightly.results.jsonl")
+    assert (scenario.publishers, scenario.rates) == ([2], [100])
+    assert (scenario.payload_phasors, scenario.durations) == ([14], [10.0])
+    assert (scenario.warmup_seconds, scenario.cooldown_seconds, scenario.settings) == (2.0, 5.0, {})
+
+
+def test_cells_vary_subscribers_slowest(tmp_path):
+    scenario = Scenario.load(write(tmp_path, dict(name="sweep", subscribers=[1, 10], publishers=[1, 2],
+                                                  rates=[50, 100], payload_phasors=28, durations=30,
+                                                  output="out.jsonl", settings=dict(pacing_mode="spin"))))
+    assert (scenario.name, scenario.output, scenario.settings) == ("sweep", "out.jsonl", dict(pacing_mode="spin"))
+    cells = list(scenario.cells())
+    assert len(cells) == scenario.num_cells == 8
+    assert cells[0] == Cell(subscribers=1, publishers=1, rate=50, payload_phasors=28, duration=30)
+    assert cells[1] == Cell(subscribers=1, publishers=1, rate=100, payload_phasors=28, duration=30)
+    assert [cell.subscribers for cell in cells] == [1, 1, 1, 1, 10, 10, 10, 10]
+
+
+def test_unknown_fields_are_rejected(tmp_path):
+    with pytest.raises(ValueError, match="rate, subscriber"):
+        Scenario.load(write(tmp_path, dict(subscriber=1, publishers=1, rate=10)))
+
+
+def test_missing_fields_are_rejected(tmp_path):
+    with pytest.raises(TypeError):
+        Scenario.load(write(tmp_path, dict(subscribers=1, publishers=1)))
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+import asyncio
+import time
+
+import pytest
+
+from gridappsd_benchmark.histogram import NS_PER_SECOND
+from gridappsd_benchmark.scheduler import RateScheduler, ScheduleReport
+
+INTERVAL = 0.002
+MS = 1_000_000
+
+
+def release(scheduler: RateScheduler, count: int, first: int = 0) -> list[int]:
+    """Release ``count`` events from event ``first`` on and return how late each one was released."""
+    late = []
+    for i in range(first, first + count):
+        deadline = scheduler.wait(i)
+        late.append(time.perf_counter_ns() - deadline)
+    return late
+
+
+@pytest.mark.parametrize("mode", ["sleep", "spin", "hybrid"])
+def test_paces_at_the_requested_rate(mode):
+    scheduler = RateScheduler(INTERVAL, mode=mode)
+    scheduler.start()
+    late = release(scheduler, 50)
+    assert min(late) >= 0
+    assert scheduler.sent == 50
+    report = scheduler.report()
+    assert report.requested_rate == pytest.approx(500.0)
+    # Deadlines are absolute, the last event is not pushed back by time spent in earlier ones.
+    assert report.achieved_rate == pytest.approx(500.0, rel=0.2)
+
+
+def test_spin_and_hybrid_release_close_to_the_deadline():
+    for mode in ("spin", "hybrid"):
+        scheduler = RateScheduler(INTERVAL, mode=mode)
+        scheduler.start()
+        release(scheduler, 50)
+        assert scheduler.lag.percentile(50) < MS
+
+
+def test_catches_up_after_a_stall():
+    scheduler = RateScheduler(INTERVAL, mode="hybrid")
+    scheduler.start()
+    release(scheduler, 5)
+    stall_ns = 25 * INTERVAL * NS_PER_SECOND
+    time.sleep(stall_ns / NS_PER_SECOND)
+    late = release(scheduler, 55, first=5)
+    # The late events are released back to back until the schedule has caught up, so it
+    # ends when it would have without the stall instead of the stall later.
+    assert late[0] >= stall_ns - 5 * INTERVAL * NS_PER_SECOND
+    assert late[-1] < stall_ns / 2
+    assert scheduler.lag.max >= stall_ns - 5 * INTERVAL * NS_PER_SECOND
+
+
+def test_start_in_the_past_releases_at_once():
+    scheduler = RateScheduler(INTERVAL, mode="sleep")
+    scheduler.start(time.perf_counter_ns() - NS_PER_SECOND)
+    begin = time.perf_counter_ns()
+    release(scheduler, 10)
+    assert time.perf_counter_ns() - begin < 10 * MS
+    assert scheduler.lag.percentile(0) >= NS_PER_SECOND - 10 * INTERVAL * NS_PER_SECOND
+
+
+def test_wait_async():
+    scheduler = RateScheduler(INTERVAL, mode="hybrid")
+
+    async def run():
+        scheduler.start()
+        for i in range(20):
+            await scheduler.wait_async(i)
+
+    asyncio.run(run())
+    assert scheduler.sent == 20
+    assert scheduler.report().achieved_rate == pytest.approx(500.0, rel=0.2)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        RateScheduler(INTERVAL, mode="busy")
+
+
+def test_combine_reports():
+    reports = []
+    for offset in range(2):
+        scheduler = RateScheduler(2 * INTERVAL, mode="spin")
+        scheduler.start(time.perf_counter_ns() + offset * INTERVAL * NS_PER_SECOND)
+        release(scheduler, 5)
+        report = scheduler.report()
+        report.warmup = 1
+        reports.append(report)
+    combined = ScheduleReport.combine(reports, requested_rate=500.0)
+    assert (combined.sent, combined.warmup, combined.lag.count) == (10, 2, 10)
+    assert combined.requested_rate == 500.0
+    assert combined.achieved_rate == pytest.approx(reports[0].achieved_rate + reports[1].achieved_rate)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from gridappsd_benchmark.sequence import SequenceCounts, SequenceTracker
+
+
+def record(tracker: SequenceTracker, publisher: int, *seqs: int) -> SequenceCounts:
+    for seq in seqs:
+        tracker.record(publisher, seq)
+    return tracker.counts
+
+
+def test_in_order():
+    counts = record(SequenceTracker(), 0, *range(10))
+    assert counts == SequenceCounts(unique=10, span=10)
+    assert counts.gaps == 0
+
+
+def test_gap_is_filled_by_a_late_message():
+    tracker = SequenceTracker()
+    counts = record(tracker, 0, 0, 1, 4)
+    assert (counts.unique, counts.gaps, counts.reordered) == (3, 2, 0)
+    record(tracker, 0, 2)
+    assert (counts.unique, counts.gaps, counts.reordered) == (4, 1, 1)
+
+
+def test_first_messages_missing_are_gaps():
+    counts = record(SequenceTracker(), 0, 3)
+    assert (counts.unique, counts.span, counts.gaps) == (1, 4, 3)
+
+
+def test_duplicates():
+    counts = record(SequenceTracker(), 0, 0, 1, 2, 2, 1)
+    assert (counts.unique, counts.duplicates, counts.reordered, counts.gaps) == (3, 2, 0, 0)
+
+
+def test_publishers_are_tracked_apart():
+    tracker = SequenceTracker()
+    for seq in range(3):
+        for publisher in (0, 1):
+            tracker.record(publisher, seq)
+    assert tracker.counts == SequenceCounts(unique=6, span=6)
+    record(tracker, 1, 0)
+    assert tracker.counts.duplicates == 1
+
+
+def test_window_edge():
+    tracker = SequenceTracker(window=8)
+    counts = record(tracker, 0, 0, 8)
+    # 0 is exactly the window behind 8, it is no longer remembered.
+    record(tracker, 0, 0)
+    assert (counts.unique, counts.duplicates, counts.reordered) == (3, 0, 1)
+    # 1 is just inside the window and was never received.
+    record(tracker, 0, 1)
+    assert (counts.unique, counts.reordered) == (4, 2)
+    record(tracker, 0, 1)
+    assert counts.duplicates == 1
+
+
+def test_jump_past_the_window_clears_the_mask():
+    tracker = SequenceTracker(window=8)
+    counts = record(tracker, 0, 0, 1, 2, 100)
+    # 95 was never received, the bits for 0-2 must not have been shifted onto it.
+    record(tracker, 0, 95)
+    assert (counts.duplicates, counts.reordered) == (0, 1)
+    record(tracker, 0, 100)
+    assert counts.duplicates == 1
+    assert counts.span == 101
+
+
+def test_publisher_counts_are_shared_between_trackers():
+    by_publisher: dict[int, SequenceCounts] = {}
+    first = SequenceTracker(publisher_counts=by_publisher)
+    second = SequenceTracker(publisher_counts=by_publisher)
+    record(first, 7, 0, 1, 2)
+    record(second, 7, 0, 2)
+    record(second, 8, 0)
+    assert by_publisher[7] == SequenceCounts(unique=5, span=6)
+    assert by_publisher[8] == SequenceCounts(unique=1, span=1)
+    assert first.counts == SequenceCounts(unique=3, span=3)
+    assert second.counts == SequenceCounts(unique=3, span=4)
+
+
+def test_counts_can_be_replaced_between_snapshots():
+    tracker = SequenceTracker()
+    record(tracker, 0, 0, 1)
+    tracker.counts = SequenceCounts()
+    # The per-publisher state is kept, only the counts start over.
+    counts = record(tracker, 0, 1, 2)
+    assert counts == SequenceCounts(unique=1, duplicates=1, span=1)
+
+
+def test_merge_and_reset():
+    counts = SequenceCounts(unique=3, duplicates=1, reordered=2, span=5)
+    counts.merge(SequenceCounts(unique=1, span=1))
+    assert counts.as_tuple() == (4, 1, 2, 6)
+    counts.reset()
+    assert counts.as_tuple() == (0, 0, 0, 0)
+
+
+def test_forget_drops_the_publisher_but_keeps_its_counts():
+    publisher_counts: dict[int, SequenceCounts] = {}
+    tracker = SequenceTracker(publisher_counts=publisher_counts)
+    record(tracker, 0, 0, 1, 3)
+    record(tracker, 1, 0)
+    tracker.forget(0)
+    assert list(tracker._publishers) == [1]
+    assert tracker.counts == SequenceCounts(unique=4, span=5)
+    assert publisher_counts[0] == SequenceCounts(unique=3, span=4)
+    tracker.forget(7)
+    # A publisher seen again after it is forgotten starts over.
+    record(tracker, 0, 0)
+    assert tracker.counts.duplicates == 0
+    assert tracker.counts.unique == 5
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from types import SimpleNamespace
+
+import pytest
+
+from gridappsd_benchmark.histogram import LatencyHistogram
+from gridappsd_benchmark.scheduler import ScheduleReport
+from gridappsd_benchmark.sequence import SequenceCounts
+from gridappsd_benchmark.store import ResultsStore, compare_runs
+
+MS = 1_000_000
+HOST = dict(node="bench1", cpus=8, broker="localhost:61613")
+
+
+def stats(latencies_ms: list[float], received: int) -> SimpleNamespace:
+    """Per-subscriber statistics as the harness keeps them."""
+    raw, corrected = LatencyHistogram(), LatencyHistogram()
+    for latency_ms in latencies_ms:
+        raw.record(round(latency_ms * MS))
+        corrected.record(round(latency_ms * MS))
+    return SimpleNamespace(raw=raw, corrected=corrected, bytes=100 * received,
+                           sequence=SequenceCounts(unique=received, span=received))
+
+
+def report(achieved_rate: float = 100.0) -> ScheduleReport:
+    return ScheduleReport(sent=1000, requested_rate=100.0, achieved_rate=achieved_rate, lag=LatencyHistogram())
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultsStore(str(tmp_path / "results.db"))
+    yield store
+    store.close()
+
+
+def save(store: ResultsStore, latencies_ms: list[float], received: int = 1000, achieved_rate: float = 100.0,
+         settings: dict | None = None) -> int:
+    merged = stats(latencies_ms, received)
+    return store.save_run("run", "", dict(num_publishers=1, **(settings or {})), HOST, report(achieved_rate), 1000,
+                          merged, {"subscriber1": merged})
+
+
+def test_save_and_load(store):
+    run_id = save(store, [1.0, 2.0, 3.0], received=990)
+    run = store.load(run_id)
+    assert (run.kind, run.sent, run.expected, run.received, run.lost, run.bytes) == ("run", 1000, 1000, 990, 10, 99000)
+    assert run.settings == dict(num_publishers=1)
+    assert run.host == HOST
+    assert run.corrected.count == run.raw.count == 3
+    assert abs(run.corrected.max - 3 * MS) < 3 * MS // 100
+    with pytest.raises(KeyError):
+        store.load(run_id + 1)
+
+
+def test_resolve_runs_and_baselines(store):
+    first = save(store, [1.0])
+    second = save(store, [1.0])
+    assert store.latest() == second
+    store.set_baseline("nightly", first)
+    assert store.resolve("nightly") == first
+    assert store.resolve(str(second)) == second
+    assert store.resolve("weekly") is None
+    assert store.resolve("99") is None
+    store.set_baseline("nightly", second)
+    assert store.baselines(second) == ["nightly"]
+    assert [run.id for run in store.recent(1)] == [second]
+    assert [run.id for run in store.recent()] == [first, second]
+
+
+def test_same_distribution_is_no_regression(store):
+    latencies = [1.0 + 0.01 * i for i in range(500)]
+    lines = compare_runs(store.load(save(store, latencies)), store.load(save(store, latencies)))
+    assert not any("REGRESSION" in line for line in lines)
+    assert any(line.startswith("corrected latency:") and "p=1.0000" in line for line in lines)
+
+
+def test_slower_latency_is_a_regression(store):
+    baseline = store.load(save(store, [1.0 + 0.01 * i for i in range(500)]))
+    candidate = store.load(save(store, [2.0 + 0.01 * i for i in range(500)]))
+    lines = compare_runs(baseline, candidate)
+    assert [line.split(":")[0] for line in lines if "REGRESSION" in line] == ["raw latency", "corrected latency"]
+    # Faster is a difference but not a regression.
+    assert not any("REGRESSION" in line for line in compare_runs(candidate, baseline))
+
+
+def test_small_significant_difference_is_within_tolerance(store):
+    baseline = store.load(save(store, [1.0 + 0.001 * i for i in range(5000)]))
+    candidate = store.load(save(store, [1.02 + 0.001 * i for i in range(5000)]))
+    assert not any("REGRESSION" in line for line in compare_runs(baseline, candidate))
+
+
+def test_loss_and_rate_regressions(store):
+    baseline = store.load(save(store, [1.0], received=1000))
+    candidate = store.load(save(store, [1.0], received=900, achieved_rate=80.0))
+    lines = compare_runs(baseline, candidate)
+    flagged = [line.split(":")[0] for line in lines if "REGRESSION" in line]
+    assert flagged == ["achieved rate", "loss"]
+
+
+def test_setting_differences(store):
+    baseline = store.load(save(store, [1.0], settings=dict(payload_phasors=14, export_dir=None)))
+    candidate = store.load(save(store, [1.0], settings=dict(payload_phasors=28, export_dir="out")))
+    lines = compare_runs(baseline, candidate)
+    assert "setting payload_phasors differs: 14 -> 28" in lines
+    assert not any("export_dir" in line for line in lines)
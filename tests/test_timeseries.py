@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*- {{{
+# ===----------------------------------------------------------------------===
+#                 GridAPPS-D Benchmarking Tool
+# ===----------------------------------------------------------------------===
+#
+# Copyright 2024 Battelle Memorial Institute
+#
+# Licensed under BSD-3
+# See the LICENSE file for more information
+#
+# ===----------------------------------------------------------------------===
+# }}}
+from gridappsd_benchmark.histogram import NS_PER_SECOND, LatencyHistogram
+from gridappsd_benchmark.sequence import SequenceCounts
+from gridappsd_benchmark.timeseries import WindowSeries, WindowSummary, is_steady
+
+MS = 1_000_000
+# A window boundary, windows start on multiples of their length.
+T0 = 1_700_000_000 * NS_PER_SECOND
+
+
+def summary(messages: int, p99_ms: float) -> WindowSummary:
+    return WindowSummary(start_ns=T0, seconds=1.0, messages=messages, bytes=0, gaps=0, duplicates=0,
+                         p50_ns=0, p99_ns=round(p99_ms * MS), max_ns=0)
+
+
+def test_first_roll_aligns_the_window():
+    series = WindowSeries(1.0)
+    assert series.due(T0)
+    assert series.roll(T0 + 300 * MS, SequenceCounts()) == 0
+    assert series.start_ns == T0
+    assert not series.due(T0 + 999 * MS)
+    assert series.due(T0 + NS_PER_SECOND)
+
+
+def test_roll_closes_a_window_with_the_change_in_counts():
+    closed = []
+    series = WindowSeries(1.0, on_close=lambda source, s: closed.append((source, s)), source="sub0")
+    counts = SequenceCounts(unique=5, span=5)
+    series.roll(T0, counts)
+    for latency_ms in (1, 2, 3):
+        series.record(latency_ms * MS, 100)
+    counts.merge(SequenceCounts(unique=3, span=4))
+    assert series.roll(T0 + NS_PER_SECOND, counts) == 1
+    (source, window), = closed
+    assert source == "sub0"
+    assert (window.start_ns, window.messages, window.bytes, window.gaps) == (T0, 3, 300, 1)
+    assert window.msgs_per_second == 3.0
+    assert window.loss_pct == 25.0
+    assert abs(window.max_ns - 3 * MS) < 3 * MS // 100
+    assert list(series.summaries) == [window]
+    # The next window starts empty.
+    assert series.latency.count == 0 and series.bytes == 0
+
+
+def test_stall_closes_empty_windows():
+    series = WindowSeries(1.0)
+    counts = SequenceCounts()
+    series.roll(T0, counts)
+    series.record(MS, 10)
+    counts.unique = counts.span = 1
+    assert series.roll(T0 + 3 * NS_PER_SECOND + 1, counts) == 3
+    assert [s.messages for s in series.summaries] == [1, 0, 0]
+    assert [s.start_ns for s in series.summaries] == [T0 + i * NS_PER_SECOND for i in range(3)]
+    assert series.start_ns == T0 + 3 * NS_PER_SECOND
+
+
+def test_capacity_keeps_the_last_windows():
+    series = WindowSeries(1.0, capacity=2)
+    series.roll(T0, SequenceCounts())
+    series.roll(T0 + 5 * NS_PER_SECOND, SequenceCounts())
+    assert [s.start_ns for s in series.summaries] == [T0 + 3 * NS_PER_SECOND, T0 + 4 * NS_PER_SECOND]
+
+
+def test_rebase_after_the_counts_were_reset():
+    series = WindowSeries(1.0)
+    counts = SequenceCounts(unique=10, span=10)
+    series.roll(T0, counts)
+    counts.reset()
+    series.rebase(counts)
+    counts.unique = counts.span = 2
+    series.roll(T0 + NS_PER_SECOND, counts)
+    assert series.summaries[-1].messages == 2
+
+
+def test_merge_encoded():
+    histogram = LatencyHistogram()
+    for latency_ms in (4, 5):
+        histogram.record(latency_ms * MS)
+    series = WindowSeries(1.0)
+    series.roll(T0, SequenceCounts())
+    series.merge_encoded(histogram.to_array(), 200)
+    assert (series.latency.count, series.bytes) == (2, 200)
+
+
+def test_is_steady():
+    assert is_steady([summary(10, 10.0), summary(10, 10.5), summary(10, 9.8)], tolerance_pct=10)
+    assert not is_steady([summary(10, 10.0), summary(10, 20.0)], tolerance_pct=10)
+    # An empty window is a stall, not a steady state.
+    assert not is_steady([summary(10, 10.0), summary(0, 10.0)], tolerance_pct=10)
+    assert not is_steady([], tolerance_pct=10)